@@ -0,0 +1,29 @@
+import logging
+import time
+from functools import wraps
+from typing import Callable, Tuple, Type
+
+
+def backoff(
+        exceptions: Tuple[Type[BaseException], ...],
+        start_sleep_time: float = 0.1,
+        factor: float = 2,
+        border_sleep_time: float = 10,
+) -> Callable:
+    """Повторяет вызов при ошибках соединения с экспоненциально растущей паузой, но не больше border_sleep_time."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def inner(*args, **kwargs):
+            sleep_time = start_sleep_time
+            while True:
+                try:
+                    return func(*args, **kwargs)
+                except exceptions as e:
+                    logging.warning(f'{func.__name__} failed: {e!r}, retry in {sleep_time:.1f}s')
+                    time.sleep(sleep_time)
+                    sleep_time = min(sleep_time * factor, border_sleep_time)
+
+        return inner
+
+    return decorator
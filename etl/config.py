@@ -0,0 +1,68 @@
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class BaseConfig(BaseSettings):
+    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', extra='ignore')
+
+
+class PostgresConfig(BaseConfig):
+    dbname: str = Field('movies_database', description='Имя базы данных', alias='DB_NAME')
+    user: str = Field('app', description='Пользователь базы данных', alias='DB_USER')
+    password: str = Field('123qwe', description='Пароль пользователя базы данных', alias='DB_PASSWORD')
+    host: str = Field('127.0.0.1', description='Хост сервера Postgres', alias='DB_HOST')
+    port: int = Field(5432, description='Порт сервера Postgres', alias='DB_PORT')
+
+
+class ElasticConfig(BaseConfig):
+    host: str = Field('http://127.0.0.1', description='Хост сервера Elasticsearch', alias='ELASTIC_HOST')
+    port: int = Field(9200, description='Порт сервера Elasticsearch', alias='ELASTIC_PORT')
+
+
+class RedisConfig(BaseConfig):
+    host: str = Field('127.0.0.1', description='Хост Redis сервера', alias='REDIS_HOST')
+    port: int = Field(6379, description='Порт Redis сервера', alias='REDIS_PORT')
+
+
+class EtlConfig(BaseConfig):
+    batch_size: int = Field(1000, description='Сколько записей читать из Postgres и отправлять в bulk за раз',
+                            alias='ETL_BATCH_SIZE')
+    poll_interval: float = Field(10, description='Пауза между проходами, когда изменений нет, в секундах',
+                                 alias='ETL_POLL_INTERVAL')
+    sync_overlap: float = Field(
+        60,
+        description='Через сколько секунд изменения перечитываются повторно ради поздних коммитов, 0 - отключено',
+        alias='ETL_SYNC_OVERLAP',
+    )
+    reconcile_interval: float = Field(
+        3600,
+        description='Как часто сверять индексы с Postgres на удалённые строки и связи, в секундах, 0 - отключено',
+        alias='ETL_RECONCILE_INTERVAL',
+    )
+    state_file: str = Field('state/etl_state.json', description='Файл с курсорами загрузки',
+                            alias='ETL_STATE_FILE')
+    es_film_index: str = Field('movies', description='Индекс Elasticsearch для фильмов', alias='ELASTIC_MOVIE_INDEX')
+    es_person_index: str = Field('persons', description='Индекс Elasticsearch для персон', alias='ELASTIC_PERSON_INDEX')
+    es_genre_index: str = Field('genres', description='Индекс Elasticsearch для жанров', alias='ELASTIC_GENRE_INDEX')
+    invalidation_channel: Optional[str] = Field(
+        'movies:invalidation',
+        description='Канал Redis, в который публикуются изменённые сущности для сброса кэша API, пусто - отключено',
+        alias='CACHE_INVALIDATION_CHANNEL',
+    )
+    reindex_min_ratio: float = Field(
+        0.9,
+        description='Новый индекс подменяет старый, только если в нём не меньше такой доли документов старого',
+        alias='REINDEX_MIN_RATIO',
+    )
+    reindex_keep_indices: int = Field(
+        1, description='Сколько предыдущих версий индекса хранить для отката после переиндексации',
+        alias='REINDEX_KEEP_INDICES',
+    )
+
+
+@lru_cache()
+def get_etl_config() -> EtlConfig:
+    return EtlConfig()
@@ -0,0 +1,26 @@
+from contextlib import closing, contextmanager
+from typing import Iterator, Tuple
+
+import psycopg2
+from elasticsearch import ConnectionError as ElasticConnectionError, Elasticsearch
+from psycopg2.extensions import connection as _connection
+from redis import Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from config import ElasticConfig, PostgresConfig, RedisConfig
+
+# Ошибки, после которых имеет смысл переподключиться и повторить
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError, ElasticConnectionError, RedisConnectionError)
+
+
+@contextmanager
+def connect() -> Iterator[Tuple[_connection, Elasticsearch, Redis]]:
+    pg_config = PostgresConfig()
+    es_config = ElasticConfig()
+    redis_config = RedisConfig()
+    with closing(psycopg2.connect(**pg_config.model_dump())) as pg, \
+            Elasticsearch(hosts=[f'{es_config.host}:{es_config.port}']) as es, \
+            Redis(host=redis_config.host, port=redis_config.port) as redis:
+        # Только чтение: каждый запрос видит свежие данные без явных commit
+        pg.set_session(readonly=True, autocommit=True)
+        yield pg, es, redis
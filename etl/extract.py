@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from psycopg2.extensions import connection as _connection
+from psycopg2.extras import RealDictCursor
+
+
+@dataclass(frozen=True)
+class Producer:
+    """Таблица-источник изменений: по ней идёт курсор (cursor_field, id), columns - нужные внешние ключи."""
+    table: str
+    cursor_field: str
+    columns: Tuple[str, ...] = ()
+
+
+# Связующие таблицы не обновляются, поэтому по ним курсор идёт по created_at
+PRODUCERS = (
+    Producer('film_work', 'updated_at'),
+    Producer('genre', 'updated_at'),
+    Producer('person', 'updated_at'),
+    Producer('genre_film_work', 'created_at', ('film_work_id',)),
+    Producer('person_film_work', 'created_at', ('film_work_id', 'person_id')),
+)
+
+FILMS_QUERY = """
+SELECT
+    fw.id,
+    fw.title,
+    fw.description,
+    fw.rating,
+    fw.type,
+    COALESCE((
+        SELECT json_agg(json_build_object('uuid', g.id, 'name', g.name) ORDER BY g.name)
+        FROM content.genre_film_work gfw
+        JOIN content.genre g ON g.id = gfw.genre_id
+        WHERE gfw.film_work_id = fw.id
+    ), '[]') AS genres,
+    COALESCE((
+        SELECT json_agg(json_build_object('uuid', p.id, 'name', p.full_name, 'role', pfw.role) ORDER BY p.full_name)
+        FROM content.person_film_work pfw
+        JOIN content.person p ON p.id = pfw.person_id
+        WHERE pfw.film_work_id = fw.id
+    ), '[]') AS persons
+FROM content.film_work fw
+WHERE fw.id = ANY(%s::uuid[])
+"""
+
+PERSONS_QUERY = """
+SELECT
+    p.id,
+    p.full_name,
+    COALESCE((
+        SELECT json_agg(json_build_object('uuid', f.film_work_id, 'roles', f.roles))
+        FROM (
+            SELECT pfw.film_work_id, array_agg(DISTINCT pfw.role ORDER BY pfw.role) AS roles
+            FROM content.person_film_work pfw
+            WHERE pfw.person_id = p.id
+            GROUP BY pfw.film_work_id
+        ) f
+    ), '[]') AS films
+FROM content.person p
+WHERE p.id = ANY(%s::uuid[])
+"""
+
+GENRES_QUERY = """
+SELECT g.id, g.name
+FROM content.genre g
+WHERE g.id = ANY(%s::uuid[])
+"""
+
+
+# Связи каждой строки в том же виде, в каком их достаёт из документа reconcile.LINKS
+LINKS_QUERIES = {
+    'film_work': """
+SELECT
+    fw.id,
+    ARRAY(SELECT 'genre:' || gfw.genre_id FROM content.genre_film_work gfw WHERE gfw.film_work_id = fw.id)
+    || ARRAY(
+        SELECT pfw.role || ':' || pfw.person_id FROM content.person_film_work pfw WHERE pfw.film_work_id = fw.id
+    ) AS links
+FROM content.film_work fw
+WHERE fw.id = ANY(%s::uuid[])
+""",
+    'person': """
+SELECT
+    p.id,
+    ARRAY(
+        SELECT pfw.film_work_id || ':' || pfw.role FROM content.person_film_work pfw WHERE pfw.person_id = p.id
+    ) AS links
+FROM content.person p
+WHERE p.id = ANY(%s::uuid[])
+""",
+    'genre': """
+SELECT g.id, ARRAY[]::text[] AS links
+FROM content.genre g
+WHERE g.id = ANY(%s::uuid[])
+""",
+}
+
+
+class PostgresExtractor:
+    def __init__(self, connection: _connection, batch_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+
+    def fetch_changed(
+            self, producer: Producer, after: Optional[List[str]], until: Optional[datetime] = None
+    ) -> List[dict]:
+        # Курсор по паре (cursor_field, id): одинаковые метки времени не теряются и не читаются повторно
+        columns = ', '.join(['id', producer.cursor_field, *producer.columns])
+        query = f'SELECT {columns} FROM content.{producer.table}'
+        conditions = []
+        params: list = []
+        if after:
+            conditions.append(f'({producer.cursor_field}, id) > (%s::timestamptz, %s::uuid)')
+            params.extend(after)
+        if until is not None:
+            conditions.append(f'{producer.cursor_field} < %s')
+            params.append(until)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += f' ORDER BY {producer.cursor_field}, id LIMIT %s'
+        params.append(self.batch_size)
+        return self._fetch(query, params)
+
+    def fetch_ids(self, table: str, after: Optional[str]) -> List[str]:
+        query = f'SELECT id FROM content.{table}'
+        params: list = []
+        if after:
+            query += ' WHERE id > %s::uuid'
+            params.append(after)
+        query += ' ORDER BY id LIMIT %s'
+        params.append(self.batch_size)
+        return [str(row['id']) for row in self._fetch(query, params)]
+
+    def fetch_now(self) -> datetime:
+        # Время берётся у Postgres: с ним же сравниваются updated_at, и расхождение часов хостов не важно
+        return self._fetch('SELECT now() AS now', [])[0]['now']
+
+    def fetch_film_ids(self, link_field: str, ids: Iterable[str]) -> List[str]:
+        table = {'genre_id': 'genre_film_work', 'person_id': 'person_film_work'}[link_field]
+        rows = self._fetch(
+            f'SELECT DISTINCT film_work_id FROM content.{table} WHERE {link_field} = ANY(%s::uuid[])', [list(ids)]
+        )
+        return [str(row['film_work_id']) for row in rows]
+
+    def fetch_links(self, table: str, ids: List[str]) -> Dict[str, Set[str]]:
+        """Связи существующих строк по id: строки, которых в ответе нет, удалены."""
+        return {str(row['id']): set(row['links']) for row in self._fetch(LINKS_QUERIES[table], [ids])}
+
+    def fetch_films(self, ids: List[str]) -> List[dict]:
+        return self._fetch(FILMS_QUERY, [ids])
+
+    def fetch_persons(self, ids: List[str]) -> List[dict]:
+        return self._fetch(PERSONS_QUERY, [ids])
+
+    def fetch_genres(self, ids: List[str]) -> List[dict]:
+        return self._fetch(GENRES_QUERY, [ids])
+
+    def _fetch(self, query: str, params: list) -> List[dict]:
+        with self.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
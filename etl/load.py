@@ -0,0 +1,50 @@
+import json
+import logging
+from typing import Iterable, List, Optional
+
+from elasticsearch import Elasticsearch, helpers
+from redis import Redis
+
+
+class ElasticLoader:
+    def __init__(self, es: Elasticsearch, chunk_size: int, refresh: bool = True):
+        self.es = es
+        self.chunk_size = chunk_size
+        self.refresh_enabled = refresh
+
+    def load(self, index: str, docs: List[dict]) -> int:
+        actions = ({'_index': index, '_id': doc['uuid'], '_source': doc} for doc in docs)
+        success, _ = helpers.bulk(self.es, actions, chunk_size=self.chunk_size)
+        return success
+
+    def delete(self, index: str, ids: Iterable[str]) -> int:
+        actions = ({'_op_type': 'delete', '_index': index, '_id': obj_id} for obj_id in ids)
+        # Документа может уже не быть в индексе
+        success, _ = helpers.bulk(self.es, actions, chunk_size=self.chunk_size, ignore_status=(404,))
+        return success
+
+    def refresh(self, index: str) -> None:
+        # Один refresh на пачку вместо refresh в каждом bulk: API, получив событие сброса кэша,
+        # уже видит новые документы и не закэширует старые, а загрузка не ждёт refresh_interval на каждый chunk
+        if self.refresh_enabled:
+            self.es.indices.refresh(index=index)
+
+
+class InvalidationPublisher:
+    """Сообщает API, какие документы обновились, в том же формате, что и админка."""
+
+    def __init__(self, redis: Optional[Redis], channel: Optional[str]):
+        self.redis = redis
+        self.channel = channel
+
+    def publish(self, entity: str, ids: List[str]) -> None:
+        if self.redis is None or not self.channel or not ids:
+            return
+        self.redis.publish(self.channel, json.dumps({'entity': entity, 'ids': ids}))
+        logging.debug('published %s %s invalidation', len(ids), entity)
+
+    def publish_all(self, entity: str) -> None:
+        # Событие без id сбрасывает у API списки и готовые ответы, а документы доживают до своего TTL
+        if self.redis is None or not self.channel:
+            return
+        self.redis.publish(self.channel, json.dumps({'entity': entity, 'ids': []}))
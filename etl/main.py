@@ -0,0 +1,35 @@
+import logging
+import time
+
+from backoff import backoff
+from config import EtlConfig, get_etl_config
+from connections import CONNECTION_ERRORS, connect
+from extract import PostgresExtractor
+from load import ElasticLoader, InvalidationPublisher
+from pipeline import EtlPipeline
+from reconcile import Reconciler
+from state import JsonFileStorage, State
+
+
+@backoff(CONNECTION_ERRORS)
+def run(config: EtlConfig) -> None:
+    with connect() as (pg, es, redis):
+        extractor = PostgresExtractor(pg, config.batch_size)
+        state = State(JsonFileStorage(config.state_file))
+        pipeline = EtlPipeline(
+            extractor,
+            ElasticLoader(es, config.batch_size),
+            InvalidationPublisher(redis, config.invalidation_channel),
+            state,
+            config,
+        )
+        reconciler = Reconciler(es, extractor, pipeline, config)
+        while True:
+            reconciler.run_if_due(state)
+            if not pipeline.sync():
+                time.sleep(config.poll_interval)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    run(get_etl_config())
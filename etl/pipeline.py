@@ -0,0 +1,156 @@
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+from config import EtlConfig
+from extract import PRODUCERS, PostgresExtractor, Producer
+from load import ElasticLoader, InvalidationPublisher
+from state import State
+from transform import transform_film, transform_genre, transform_person
+
+ZERO_UUID = '00000000-0000-0000-0000-000000000000'
+# Ключ состояния отстающего курсора: {table}:settled
+SETTLED_SUFFIX = ':settled'
+
+
+@dataclass(frozen=True)
+class Target:
+    """Индекс сущности и откуда берутся его документы."""
+    entity: str
+    table: str
+    alias: str
+    fetch: Callable[[List[str]], List[dict]]
+    transform: Callable[[dict], dict]
+
+
+def get_targets(config: EtlConfig, extractor: PostgresExtractor) -> Dict[str, Target]:
+    return {
+        'film': Target('film', 'film_work', config.es_film_index, extractor.fetch_films, transform_film),
+        'person': Target('person', 'person', config.es_person_index, extractor.fetch_persons, transform_person),
+        'genre': Target('genre', 'genre', config.es_genre_index, extractor.fetch_genres, transform_genre),
+    }
+
+
+@dataclass
+class Changes:
+    films: Set[str] = field(default_factory=set)
+    persons: Set[str] = field(default_factory=set)
+    genres: Set[str] = field(default_factory=set)
+
+
+class EtlPipeline:
+    """Переносит изменения из Postgres в Elasticsearch пачками, сохраняя курсор после каждой пачки.
+
+    Курсор двигается только после успешной загрузки в ES, поэтому после падения пачка
+    просто загружается повторно: индексация по _id идемпотентна.
+    """
+
+    def __init__(
+            self,
+            extractor: PostgresExtractor,
+            loader: ElasticLoader,
+            publisher: InvalidationPublisher,
+            state: State,
+            config: EtlConfig,
+    ):
+        self.extractor = extractor
+        self.loader = loader
+        self.publisher = publisher
+        self.state = state
+        self.config = config
+        self.targets = get_targets(config, extractor)
+
+    def sync(self) -> int:
+        total = sum(self.sync_producer(producer) for producer in PRODUCERS)
+        if self.config.sync_overlap:
+            total += sum(self.settle_producer(producer) for producer in PRODUCERS)
+        return total
+
+    def sync_producer(self, producer: Producer, key: Optional[str] = None, until: Optional[datetime] = None) -> int:
+        key = key or producer.table
+        total = 0
+        while True:
+            rows = self.extractor.fetch_changed(producer, self.state.get_state(key), until)
+            if not rows:
+                return total
+
+            started = time.monotonic()
+            loaded = self.load_changes(self.collect_changes(producer, rows))
+            last = rows[-1]
+            self.state.set_state(key, [last[producer.cursor_field].isoformat(), str(last['id'])])
+            total += len(rows)
+            logging.info(f'{key}: {len(rows)} changes, {loaded} documents in {time.monotonic() - started:.2f}s')
+            if len(rows) < self.config.batch_size:
+                return total
+
+    def settle_producer(self, producer: Producer) -> int:
+        """Повторный проход по изменениям, которые старше sync_overlap секунд.
+
+        Транзакция может выставить updated_at и закоммититься позже, чем основной курсор ушёл за эту метку,
+        и основной проход её строку уже не увидит. Второй курсор идёт следом с отставанием на sync_overlap
+        и перечитывает каждую строку ровно один раз: к этому времени её транзакция уже закоммичена.
+        """
+        key = f'{producer.table}{SETTLED_SUFFIX}'
+        until = self.extractor.fetch_now() - timedelta(seconds=self.config.sync_overlap)
+        if self.state.get_state(key) is None:
+            # Первый запуск: всё, что старше until, уже прочитал основной курсор
+            cursor = self.state.get_state(producer.table)
+            if cursor and datetime.fromisoformat(cursor[0]) < until:
+                self.state.set_state(key, cursor)
+            else:
+                self.state.set_state(key, [until.isoformat(), ZERO_UUID])
+        return self.sync_producer(producer, key, until)
+
+    def collect_changes(self, producer: Producer, rows: List[dict]) -> Changes:
+        ids = [str(row['id']) for row in rows]
+        changes = Changes()
+        if producer.table == 'film_work':
+            changes.films.update(ids)
+        elif producer.table == 'genre':
+            changes.genres.update(ids)
+            # Название жанра денормализовано в документы фильмов
+            changes.films.update(self.extractor.fetch_film_ids('genre_id', ids))
+        elif producer.table == 'person':
+            changes.persons.update(ids)
+            changes.films.update(self.extractor.fetch_film_ids('person_id', ids))
+        elif producer.table == 'genre_film_work':
+            changes.films.update(str(row['film_work_id']) for row in rows)
+        elif producer.table == 'person_film_work':
+            changes.films.update(str(row['film_work_id']) for row in rows)
+            changes.persons.update(str(row['person_id']) for row in rows)
+        return changes
+
+    def load_changes(self, changes: Changes) -> int:
+        ids = {'film': changes.films, 'person': changes.persons, 'genre': changes.genres}
+        return sum(
+            self.load_documents(target.entity, target.alias, ids[target.entity], target.fetch, target.transform)
+            for target in self.targets.values()
+        )
+
+    def load_documents(
+            self,
+            entity: str,
+            index: str,
+            ids: Set[str],
+            fetch: Callable[[List[str]], List[dict]],
+            transform: Callable[[dict], Dict],
+    ) -> int:
+        loaded = 0
+        ids = sorted(ids)
+        chunks = [ids[start:start + self.config.batch_size] for start in range(0, len(ids), self.config.batch_size)]
+        for chunk in chunks:
+            docs = [transform(row) for row in fetch(chunk)]
+            loaded += self.loader.load(index, docs)
+            # Строки, которых уже нет в Postgres, удаляются и из индекса
+            if deleted := set(chunk) - {doc['uuid'] for doc in docs}:
+                self.loader.delete(index, deleted)
+        if not chunks:
+            return loaded
+
+        # Сброс кэша API только после того, как изменения стали видны поиску
+        self.loader.refresh(index)
+        for chunk in chunks:
+            self.publisher.publish(entity, chunk)
+        return loaded
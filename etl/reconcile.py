@@ -0,0 +1,107 @@
+import logging
+import time
+from typing import Callable, Dict, Iterator, List, Set
+
+from elasticsearch import Elasticsearch
+
+from config import EtlConfig
+from extract import PostgresExtractor
+from pipeline import EtlPipeline, Target
+from state import State
+from transform import ROLE_FIELDS
+
+STATE_KEY = 'reconciled_at'
+
+
+def get_film_links(doc: dict) -> Set[str]:
+    links = {f'genre:{genre["uuid"]}' for genre in doc.get('genres', [])}
+    for role, field in ROLE_FIELDS.items():
+        links.update(f'{role}:{person["uuid"]}' for person in doc.get(field, []))
+    return links
+
+
+def get_person_links(doc: dict) -> Set[str]:
+    return {f'{film["uuid"]}:{role}' for film in doc.get('films', []) for role in film['roles']}
+
+
+def get_genre_links(doc: dict) -> Set[str]:
+    return set()
+
+
+# Поля документа со связями и как из них получить строки в формате LINKS_QUERIES
+LINKS: Dict[str, tuple] = {
+    'film': (['uuid', 'genres.uuid', *(f'{field}.uuid' for field in ROLE_FIELDS.values())], get_film_links),
+    'person': (['uuid', 'films'], get_person_links),
+    'genre': (['uuid'], get_genre_links),
+}
+# Роли, которых нет в ROLE_FIELDS, в документ фильма не попадают и не должны считаться расхождением
+KNOWN_FILM_LINKS = ('genre:', *(f'{role}:' for role in ROLE_FIELDS))
+
+
+class Reconciler:
+    """Сверяет индексы с Postgres и исправляет то, что не видно по курсорам изменений.
+
+    Курсоры идут по updated_at и created_at, поэтому удалённые строки фильмов, персон и жанров,
+    как и удалённые связи между ними, в выборку изменений не попадают. Сверка проходит индекс целиком
+    и загружает заново документы, у которых нет строки или разошлись связи: load_documents удалит
+    первые из индекса и сообщит API о тех и других.
+    """
+
+    def __init__(self, es: Elasticsearch, extractor: PostgresExtractor, pipeline: EtlPipeline, config: EtlConfig):
+        self.es = es
+        self.extractor = extractor
+        self.pipeline = pipeline
+        self.config = config
+
+    def run_if_due(self, state: State) -> int:
+        if not self.config.reconcile_interval:
+            return 0
+        # Время хранится в состоянии, чтобы перезапуски не гоняли полную сверку каждый раз
+        if time.time() - state.get_state(STATE_KEY, 0) < self.config.reconcile_interval:
+            return 0
+        fixed = self.reconcile()
+        state.set_state(STATE_KEY, time.time())
+        return fixed
+
+    def reconcile(self) -> int:
+        return sum(self.reconcile_target(target) for target in self.pipeline.targets.values())
+
+    def reconcile_target(self, target: Target) -> int:
+        fields, get_links = LINKS[target.entity]
+        checked = 0
+        fixed = 0
+        for docs in self.iter_documents(target.alias, fields):
+            stale = self.find_stale(target, docs, get_links)
+            if stale:
+                self.pipeline.load_documents(target.entity, target.alias, stale, target.fetch, target.transform)
+            checked += len(docs)
+            fixed += len(stale)
+        logging.info(f'{target.alias}: {checked} documents reconciled, {fixed} stale')
+        return fixed
+
+    def find_stale(self, target: Target, docs: List[dict], get_links: Callable[[dict], Set[str]]) -> Set[str]:
+        expected = self.extractor.fetch_links(target.table, [doc['uuid'] for doc in docs])
+        stale = set()
+        for doc in docs:
+            links = expected.get(doc['uuid'])
+            if links is not None and target.entity == 'film':
+                links = {link for link in links if link.startswith(KNOWN_FILM_LINKS)}
+            if links is None or links != get_links(doc):
+                stale.add(doc['uuid'])
+        return stale
+
+    def iter_documents(self, index: str, fields: List[str]) -> Iterator[List[dict]]:
+        search_after = None
+        while True:
+            response = self.es.search(
+                index=index,
+                size=self.config.batch_size,
+                sort=[{'uuid': 'asc'}],
+                source=fields,
+                search_after=search_after,
+            )
+            hits = response['hits']['hits']
+            if not hits:
+                return
+            yield [hit['_source'] for hit in hits]
+            search_after = hits[-1]['sort']
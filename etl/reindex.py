@@ -0,0 +1,166 @@
+import argparse
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from elasticsearch import Elasticsearch, NotFoundError
+
+from config import EtlConfig, get_etl_config
+from connections import connect
+from extract import PRODUCERS, PostgresExtractor
+from load import ElasticLoader, InvalidationPublisher
+from pipeline import ZERO_UUID, EtlPipeline, Target, get_targets
+from state import MemoryStorage, State
+
+# На время загрузки: без refresh и реплик bulk пишет только в основные шарды и не создаёт лишних сегментов
+BULK_SETTINGS = {'refresh_interval': '-1', 'number_of_replicas': 0}
+# Какие настройки живого индекса переносятся в новый, остальные (uuid, creation_date, ...) служебные
+COPIED_SETTINGS = (
+    'number_of_shards', 'number_of_replicas', 'refresh_interval', 'analysis', 'sort', 'max_result_window',
+    'similarity', 'mapping',
+)
+# Догоняющий проход начинается раньше старта: транзакция могла выставить updated_at до него, а закоммититься после
+CATCHUP_OVERLAP = timedelta(minutes=1)
+ENTITIES = ('film', 'person', 'genre')
+
+
+class ReindexError(Exception):
+    """Новый индекс не прошёл проверку, алиас остался на старом."""
+
+
+class Reindexer:
+    """Переиндексация без простоя: полная загрузка в новый версионный индекс и атомарное переключение алиаса.
+
+    API и инкрементальный ETL работают с алиасом и всё время загрузки продолжают читать и писать старый индекс.
+    """
+
+    def __init__(self, es: Elasticsearch, extractor: PostgresExtractor, pipeline: EtlPipeline, config: EtlConfig):
+        self.es = es
+        self.extractor = extractor
+        self.pipeline = pipeline
+        self.config = config
+
+    def reindex(self, target: Target) -> str:
+        template = self.get_template(target.alias)
+        settings = template['settings']
+        live_settings = {
+            'refresh_interval': settings.get('refresh_interval', '1s'),
+            'number_of_replicas': settings.get('number_of_replicas', 1),
+        }
+        index = f'{target.alias}_v{datetime.now(timezone.utc):%Y%m%d%H%M%S}'
+        if template['from_index_template']:
+            # Схема придёт из шаблона индексов, явно задаются только настройки на время загрузки
+            self.es.indices.create(index=index, settings=BULK_SETTINGS)
+        else:
+            self.es.indices.create(index=index, mappings=template['mappings'], settings={**settings, **BULK_SETTINGS})
+        logging.info(f'created {index} for {target.alias}')
+        try:
+            loaded = self.load(target, index)
+            self.es.indices.put_settings(index=index, settings=live_settings)
+            self.es.indices.refresh(index=index)
+            self.verify(target.alias, index, loaded)
+        except Exception:
+            self.es.indices.delete(index=index, ignore_unavailable=True)
+            raise
+
+        self.swap_alias(target.alias, index)
+        self.delete_old_indices(target.alias, index)
+        return index
+
+    def get_template(self, alias: str) -> dict:
+        # Схема из кода сервиса (python -m db.indices apply в fastapi_solution) хранится шаблоном индексов
+        try:
+            response = self.es.indices.get_index_template(name=alias)
+        except NotFoundError:
+            pass
+        else:
+            template = response['index_templates'][0]['index_template']['template']
+            settings = template.get('settings', {})
+            return {
+                'mappings': template.get('mappings', {}),
+                'settings': settings.get('index', settings),
+                'from_index_template': True,
+            }
+
+        # Без шаблона схема копируется с живого индекса
+        try:
+            response = self.es.indices.get(index=alias)
+        except NotFoundError:
+            raise ReindexError(f'index {alias} and its template not found, there is no schema to use') from None
+
+        # Версии называются по времени создания, поэтому самая новая - последняя по имени
+        info = response[max(response)]
+        settings = {key: value for key, value in info['settings']['index'].items() if key in COPIED_SETTINGS}
+        return {'mappings': info['mappings'], 'settings': settings, 'from_index_template': False}
+
+    def load(self, target: Target, index: str) -> int:
+        loaded = 0
+        after = None
+        while ids := self.extractor.fetch_ids(target.table, after):
+            loaded += self.pipeline.load_documents(target.entity, index, set(ids), target.fetch, target.transform)
+            after = ids[-1]
+            logging.info(f'{index}: {loaded} documents loaded')
+        return loaded
+
+    def verify(self, alias: str, index: str, loaded: int) -> None:
+        count = self.es.count(index=index)['count']
+        if count != loaded:
+            raise ReindexError(f'{index} has {count} documents, {loaded} were loaded')
+
+        live_count = self.es.count(index=alias)['count']
+        if count < live_count * self.config.reindex_min_ratio:
+            raise ReindexError(f'{index} has {count} documents, live {alias} has {live_count}')
+
+    def swap_alias(self, alias: str, index: str) -> None:
+        try:
+            current = list(self.es.indices.get_alias(name=alias))
+        except NotFoundError:
+            current = []
+
+        actions: List[dict] = [{'remove': {'index': name, 'alias': alias}} for name in current]
+        if not current and self.es.indices.exists(index=alias):
+            # Первая переиндексация: живой индекс назван как алиас и удаляется в том же атомарном запросе
+            actions.append({'remove_index': {'index': alias}})
+        actions.append({'add': {'index': index, 'alias': alias}})
+        self.es.indices.update_aliases(actions=actions)
+        logging.info(f'{alias} switched from {current or alias} to {index}')
+
+    def delete_old_indices(self, alias: str, index: str) -> None:
+        previous = sorted(name for name in self.es.indices.get(index=f'{alias}_v*') if name != index)
+        # Последние версии остаются для отката переключением алиаса обратно
+        for name in previous[:max(len(previous) - self.config.reindex_keep_indices, 0)]:
+            self.es.indices.delete(index=name)
+            logging.info(f'deleted old index {name}')
+
+
+def run(config: EtlConfig, entities: List[str]) -> None:
+    with connect() as (pg, es, redis):
+        extractor = PostgresExtractor(pg, config.batch_size)
+        started = extractor.fetch_now()
+        # Новый индекс ещё не виден API, сбрасывать кэш во время загрузки незачем, а refresh у него выключен
+        # до конца загрузки и делается один раз перед переключением алиаса
+        bulk_loader = ElasticLoader(es, config.batch_size, refresh=False)
+        pipeline = EtlPipeline(
+            extractor, bulk_loader, InvalidationPublisher(None, None), State(MemoryStorage()), config
+        )
+        reindexer = Reindexer(es, extractor, pipeline, config)
+        targets = get_targets(config, extractor)
+        for entity in entities:
+            reindexer.reindex(targets[entity])
+
+        # Изменения, сделанные во время загрузки, попали только в старые индексы: догоняем их уже через алиасы
+        publisher = InvalidationPublisher(redis, config.invalidation_channel)
+        cursor = [(started - CATCHUP_OVERLAP).isoformat(), ZERO_UUID]
+        state = State(MemoryStorage({producer.table: cursor for producer in PRODUCERS}))
+        # Догоняющий проход сам начинается с запасом CATCHUP_OVERLAP, отстающий курсор ему не нужен
+        catchup_config = config.model_copy(update={'sync_overlap': 0})
+        EtlPipeline(extractor, ElasticLoader(es, config.batch_size), publisher, state, catchup_config).sync()
+        for entity in entities:
+            publisher.publish_all(entity)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Переиндексация без простоя через алиасы Elasticsearch')
+    parser.add_argument('entities', nargs='*', choices=ENTITIES, help='что переиндексировать, по умолчанию всё')
+    run(get_etl_config(), parser.parse_args().entities or list(ENTITIES))
@@ -0,0 +1,66 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+
+class BaseStorage(ABC):
+    @abstractmethod
+    def save_state(self, state: Dict[str, Any]) -> None:
+        pass
+
+    @abstractmethod
+    def retrieve_state(self) -> Dict[str, Any]:
+        pass
+
+
+class JsonFileStorage(BaseStorage):
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        # Пишем во временный файл и переименовываем: после падения остаётся либо старое, либо новое состояние
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.file_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+
+    def retrieve_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.file_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+
+class MemoryStorage(BaseStorage):
+    """Состояние на время одного запуска, например для догоняющего прохода после переиндексации."""
+
+    def __init__(self, state: Optional[Dict[str, Any]] = None):
+        self.state = dict(state or {})
+
+    def save_state(self, state: Dict[str, Any]) -> None:
+        self.state = dict(state)
+
+    def retrieve_state(self) -> Dict[str, Any]:
+        return dict(self.state)
+
+
+class State:
+    """Курсоры загрузки по ключам, сохраняются в хранилище сразу при изменении."""
+
+    def __init__(self, storage: BaseStorage):
+        self.storage = storage
+        self._state = storage.retrieve_state()
+
+    def set_state(self, key: str, value: Any) -> None:
+        self._state[key] = value
+        self.storage.save_state(self._state)
+
+    def get_state(self, key: str, default: Optional[Any] = None) -> Any:
+        return self._state.get(key, default)
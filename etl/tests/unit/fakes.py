@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from config import EtlConfig
+
+
+def make_config(**update) -> EtlConfig:
+    return EtlConfig().model_copy(update={'batch_size': 2, **update})
+
+
+class FakeExtractor:
+    """Строки Postgres в памяти: fetch_* отдают только существующие id, как запросы extract.py."""
+
+    def __init__(self, films: Dict[str, dict] = None, persons: Dict[str, dict] = None,
+                 links: Dict[str, Dict[str, Set[str]]] = None, film_ids: Dict[str, List[str]] = None,
+                 changed: Dict[str, List[dict]] = None, now: datetime = None):
+        self.films = films or {}
+        self.persons = persons or {}
+        self.links = links or {}
+        self.film_ids = film_ids or {}
+        self.changed = changed or {}
+        self.now = now
+
+    def fetch_changed(self, producer, after: Optional[List[str]], until: Optional[datetime] = None) -> List[dict]:
+        def key(row: dict) -> tuple:
+            return row['updated_at'], row['id']
+
+        rows = sorted(self.changed.get(producer.table, []), key=key)
+        if after:
+            rows = [row for row in rows if key(row) > (datetime.fromisoformat(after[0]), after[1])]
+        if until is not None:
+            rows = [row for row in rows if row['updated_at'] < until]
+        return rows
+
+    def fetch_now(self) -> datetime:
+        return self.now
+
+    def fetch_film_ids(self, column: str, ids: List[str]) -> List[str]:
+        return [film_id for obj_id in ids for film_id in self.film_ids.get(obj_id, [])]
+
+    def fetch_links(self, table: str, ids: List[str]) -> Dict[str, Set[str]]:
+        table_links = self.links.get(table, {})
+        return {obj_id: table_links[obj_id] for obj_id in ids if obj_id in table_links}
+
+    def fetch_films(self, ids: List[str]) -> List[dict]:
+        return [self.films[obj_id] for obj_id in ids if obj_id in self.films]
+
+    def fetch_persons(self, ids: List[str]) -> List[dict]:
+        return [self.persons[obj_id] for obj_id in ids if obj_id in self.persons]
+
+    def fetch_genres(self, ids: List[str]) -> List[dict]:
+        return []
+
+
+class FakeLoader:
+    """Записывает вызовы в общий журнал, чтобы проверять порядок загрузки и публикации."""
+
+    def __init__(self, log: list):
+        self.log = log
+
+    def load(self, index: str, docs: List[dict]) -> int:
+        self.log.append(('load', index, sorted(doc['uuid'] for doc in docs)))
+        return len(docs)
+
+    def delete(self, index: str, ids: Iterable[str]) -> int:
+        self.log.append(('delete', index, sorted(ids)))
+        return len(ids)
+
+    def refresh(self, index: str) -> None:
+        self.log.append(('refresh', index))
+
+
+class FakePublisher:
+    def __init__(self, log: list):
+        self.log = log
+
+    def publish(self, entity: str, ids: List[str]) -> None:
+        self.log.append(('publish', entity, list(ids)))
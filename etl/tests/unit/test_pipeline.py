@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from extract import PRODUCERS
+from pipeline import SETTLED_SUFFIX, Changes, EtlPipeline
+from state import MemoryStorage, State
+from tests.unit.fakes import FakeExtractor, FakeLoader, FakePublisher, make_config
+
+PRODUCER = {producer.table: producer for producer in PRODUCERS}
+
+
+def film_row(film_id: str) -> dict:
+    return {'id': film_id, 'title': film_id, 'description': None, 'rating': 1.0, 'type': 'movie',
+            'genres': [], 'persons': []}
+
+
+def make_pipeline(extractor: FakeExtractor, log: list) -> EtlPipeline:
+    return EtlPipeline(extractor, FakeLoader(log), FakePublisher(log), State(MemoryStorage()), make_config())
+
+
+@pytest.mark.parametrize('table, rows, films, persons, genres', [
+    ('film_work', [{'id': 'f1'}], {'f1'}, set(), set()),
+    ('genre', [{'id': 'g1'}], {'f1', 'f2'}, set(), {'g1'}),
+    ('person', [{'id': 'p1'}], {'f1', 'f2'}, {'p1'}, set()),
+    ('genre_film_work', [{'id': 'l1', 'film_work_id': 'f1'}], {'f1'}, set(), set()),
+    ('person_film_work', [{'id': 'l1', 'film_work_id': 'f1', 'person_id': 'p1'}], {'f1'}, {'p1'}, set()),
+])
+def test_collect_changes(table, rows, films, persons, genres):
+    pipeline = make_pipeline(FakeExtractor(film_ids={'g1': ['f1', 'f2'], 'p1': ['f1', 'f2']}), [])
+
+    changes = pipeline.collect_changes(PRODUCER[table], rows)
+
+    assert (changes.films, changes.persons, changes.genres) == (films, persons, genres)
+
+
+def test_missing_rows_are_deleted_and_index_refreshed_before_publish():
+    log = []
+    pipeline = make_pipeline(FakeExtractor(films={'f1': film_row('f1'), 'f3': film_row('f3')}), log)
+
+    loaded = pipeline.load_documents('film', 'movies', {'f3', 'f2', 'f1'}, pipeline.extractor.fetch_films,
+                                     lambda row: {'uuid': row['id']})
+
+    assert loaded == 2
+    assert log == [
+        ('load', 'movies', ['f1']),
+        ('delete', 'movies', ['f2']),
+        ('load', 'movies', ['f3']),
+        ('refresh', 'movies'),
+        ('publish', 'film', ['f1', 'f2']),
+        ('publish', 'film', ['f3']),
+    ]
+
+
+def test_nothing_to_load_skips_refresh():
+    log = []
+    pipeline = make_pipeline(FakeExtractor(), log)
+
+    assert pipeline.load_documents('film', 'movies', set(), pipeline.extractor.fetch_films, dict) == 0
+    assert log == []
+
+
+def test_changes_go_to_index_of_their_entity():
+    log = []
+    config = make_config()
+    extractor = FakeExtractor(persons={'p1': {'id': 'p1', 'full_name': 'P', 'films': []}})
+    pipeline = make_pipeline(extractor, log)
+
+    pipeline.load_changes(Changes(films={'f1'}, persons={'p1'}, genres={'g1'}))
+
+    assert [entry for entry in log if entry[0] == 'publish'] == [
+        ('publish', 'film', ['f1']), ('publish', 'person', ['p1']), ('publish', 'genre', ['g1']),
+    ]
+    assert ('load', config.es_person_index, ['p1']) in log
+
+
+NOW = datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def changed_film(film_id: str, seconds_ago: float) -> dict:
+    return {'id': film_id, 'updated_at': NOW - timedelta(seconds=seconds_ago)}
+
+
+def test_late_commit_behind_cursor_is_picked_up_by_settled_cursor():
+    log = []
+    extractor = FakeExtractor(changed={'film_work': [changed_film('f2', 30)]}, now=NOW)
+    pipeline = make_pipeline(extractor, log)
+    pipeline.sync_producer(PRODUCER['film_work'])
+    assert pipeline.settle_producer(PRODUCER['film_work']) == 0
+
+    # f1 получила updated_at раньше f2, но закоммитилась после того, как основной курсор ушёл за f2
+    extractor.changed['film_work'].append(changed_film('f1', 40))
+    assert pipeline.sync_producer(PRODUCER['film_work']) == 0
+    extractor.now = NOW + timedelta(seconds=pipeline.config.sync_overlap)
+
+    assert pipeline.settle_producer(PRODUCER['film_work']) == 2
+    assert log[-1] == ('publish', 'film', ['f1', 'f2'])
+
+
+def test_settled_cursor_reads_each_row_once():
+    extractor = FakeExtractor(changed={'film_work': [changed_film('f1', 90)]}, now=NOW - timedelta(seconds=60))
+    pipeline = make_pipeline(extractor, [])
+    pipeline.sync()
+    extractor.now = NOW + timedelta(seconds=60)
+
+    assert pipeline.settle_producer(PRODUCER['film_work']) == 1
+    assert pipeline.settle_producer(PRODUCER['film_work']) == 0
+
+
+def test_zero_overlap_disables_settled_cursor():
+    extractor = FakeExtractor(changed={'film_work': [changed_film('f1', 90)]}, now=NOW)
+    pipeline = EtlPipeline(extractor, FakeLoader([]), FakePublisher([]), State(MemoryStorage()),
+                           make_config(sync_overlap=0))
+
+    assert pipeline.sync() == 1
+    assert pipeline.state.get_state(f'film_work{SETTLED_SUFFIX}') is None
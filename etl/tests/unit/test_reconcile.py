@@ -0,0 +1,99 @@
+from pipeline import EtlPipeline, get_targets
+from reconcile import STATE_KEY, Reconciler
+from state import MemoryStorage, State
+from tests.unit.fakes import FakeExtractor, FakeLoader, FakePublisher, make_config
+
+FILM = {'uuid': 'f1', 'genres': [{'uuid': 'g1'}], 'actors': [{'uuid': 'p1'}], 'directors': [], 'writers': []}
+FILM_LINKS = {'genre:g1', 'actor:p1'}
+
+
+class FakeElasticsearch:
+    """search_after по отсортированным по uuid документам."""
+
+    def __init__(self, indices: dict):
+        self.indices = indices
+        self.searches = []
+
+    def search(self, index, size, sort, source, search_after):
+        self.searches.append((index, search_after))
+        docs = sorted(self.indices.get(index, []), key=lambda doc: doc['uuid'])
+        if search_after is not None:
+            docs = [doc for doc in docs if doc['uuid'] > search_after[0]]
+        return {'hits': {'hits': [{'_source': doc, 'sort': [doc['uuid']]} for doc in docs[:size]]}}
+
+
+def make_reconciler(indices: dict, extractor: FakeExtractor, log: list, **config) -> Reconciler:
+    config = make_config(**config)
+    pipeline = EtlPipeline(extractor, FakeLoader(log), FakePublisher(log), State(MemoryStorage()), config)
+    return Reconciler(FakeElasticsearch(indices), extractor, pipeline, config)
+
+
+def film_target(reconciler: Reconciler):
+    return get_targets(reconciler.config, reconciler.extractor)['film']
+
+
+def test_film_in_sync_is_left_alone():
+    log = []
+    links = {'film_work': {'f1': FILM_LINKS | {'producer:p2'}}}
+    reconciler = make_reconciler({'movies': [FILM]}, FakeExtractor(links=links), log)
+
+    assert reconciler.reconcile_target(film_target(reconciler)) == 0
+    assert log == []
+
+
+def test_deleted_film_is_removed_from_index():
+    log = []
+    reconciler = make_reconciler({'movies': [FILM]}, FakeExtractor(), log)
+
+    assert reconciler.reconcile_target(film_target(reconciler)) == 1
+    assert log == [
+        ('load', 'movies', []), ('delete', 'movies', ['f1']), ('refresh', 'movies'), ('publish', 'film', ['f1']),
+    ]
+
+
+def test_film_with_deleted_link_is_reloaded():
+    links = {'film_work': {'f1': {'genre:g1'}}}
+    reconciler = make_reconciler({'movies': [FILM]}, FakeExtractor(links=links), [])
+
+    assert reconciler.find_stale(film_target(reconciler), [FILM], lambda doc: FILM_LINKS) == {'f1'}
+
+
+def test_person_links_include_every_role():
+    person = {'uuid': 'p1', 'films': [{'uuid': 'f1', 'roles': ['actor', 'writer']}]}
+    links = {'person': {'p1': {'f1:actor'}}}
+    reconciler = make_reconciler({'persons': [person]}, FakeExtractor(links=links), [])
+    target = get_targets(reconciler.config, reconciler.extractor)['person']
+
+    assert reconciler.reconcile_target(target) == 1
+
+
+def test_whole_index_is_scanned_in_pages():
+    docs = [{'uuid': f'g{i}'} for i in range(5)]
+    links = {'genre': {doc['uuid']: set() for doc in docs}}
+    reconciler = make_reconciler({'genres': docs}, FakeExtractor(links=links), [])
+    target = get_targets(reconciler.config, reconciler.extractor)['genre']
+
+    reconciler.reconcile_target(target)
+
+    assert reconciler.es.searches == [('genres', None), ('genres', ['g1']), ('genres', ['g3']), ('genres', ['g4'])]
+
+
+def test_run_if_due_respects_interval():
+    reconciler = make_reconciler({}, FakeExtractor(), [], reconcile_interval=3600)
+    state = State(MemoryStorage())
+
+    reconciler.run_if_due(state)
+    searches = len(reconciler.es.searches)
+    reconciler.run_if_due(state)
+
+    assert searches == 3
+    assert len(reconciler.es.searches) == searches
+    assert state.get_state(STATE_KEY) is not None
+
+
+def test_zero_interval_disables_reconciliation():
+    reconciler = make_reconciler({}, FakeExtractor(), [], reconcile_interval=0)
+
+    reconciler.run_if_due(State(MemoryStorage()))
+
+    assert reconciler.es.searches == []
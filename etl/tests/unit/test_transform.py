@@ -0,0 +1,53 @@
+from uuid import UUID
+
+from transform import transform_film, transform_genre, transform_person
+
+FILM_ID = UUID('00000000-0000-0000-0000-000000000001')
+PERSON_ID = UUID('00000000-0000-0000-0000-000000000002')
+GENRE_ID = UUID('00000000-0000-0000-0000-000000000003')
+
+
+def test_film_persons_are_split_by_role():
+    doc = transform_film({
+        'id': FILM_ID,
+        'title': 'Star Wars',
+        'description': None,
+        'rating': None,
+        'type': 'movie',
+        'genres': [{'uuid': GENRE_ID, 'name': 'Sci-Fi'}],
+        'persons': [
+            {'uuid': PERSON_ID, 'name': 'George Lucas', 'role': 'director'},
+            {'uuid': PERSON_ID, 'name': 'George Lucas', 'role': 'writer'},
+            {'uuid': PERSON_ID, 'name': 'George Lucas', 'role': 'producer'},
+        ],
+    })
+
+    assert doc == {
+        'uuid': str(FILM_ID),
+        'title': 'Star Wars',
+        'description': None,
+        'rating': 0.0,
+        'type': 'movie',
+        'genres': [{'uuid': str(GENRE_ID), 'name': 'Sci-Fi'}],
+        'actors': [],
+        'directors': [{'uuid': str(PERSON_ID), 'name': 'George Lucas'}],
+        'writers': [{'uuid': str(PERSON_ID), 'name': 'George Lucas'}],
+    }
+
+
+def test_person_films_keep_roles():
+    doc = transform_person({
+        'id': PERSON_ID,
+        'full_name': 'George Lucas',
+        'films': [{'uuid': FILM_ID, 'roles': ['director', 'writer']}],
+    })
+
+    assert doc == {
+        'uuid': str(PERSON_ID),
+        'name': 'George Lucas',
+        'films': [{'uuid': str(FILM_ID), 'roles': ['director', 'writer']}],
+    }
+
+
+def test_genre():
+    assert transform_genre({'id': GENRE_ID, 'name': 'Sci-Fi'}) == {'uuid': str(GENRE_ID), 'name': 'Sci-Fi'}
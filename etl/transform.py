@@ -0,0 +1,40 @@
+from typing import Dict, List
+
+# Роль в person_film_work -> поле документа фильма
+ROLE_FIELDS = {
+    'actor': 'actors',
+    'director': 'directors',
+    'writer': 'writers',
+}
+
+
+def transform_film(row: dict) -> dict:
+    people: Dict[str, List[dict]] = {field: [] for field in ROLE_FIELDS.values()}
+    for person in row['persons']:
+        if field := ROLE_FIELDS.get(person['role']):
+            people[field].append({'uuid': str(person['uuid']), 'name': person['name']})
+
+    return {
+        'uuid': str(row['id']),
+        'title': row['title'],
+        'description': row['description'],
+        'rating': row['rating'] or 0.0,
+        'type': row['type'],
+        'genres': [{'uuid': str(genre['uuid']), 'name': genre['name']} for genre in row['genres']],
+        **people,
+    }
+
+
+def transform_person(row: dict) -> dict:
+    return {
+        'uuid': str(row['id']),
+        'name': row['full_name'],
+        'films': [{'uuid': str(film['uuid']), 'roles': film['roles']} for film in row['films']],
+    }
+
+
+def transform_genre(row: dict) -> dict:
+    return {
+        'uuid': str(row['id']),
+        'name': row['name'],
+    }
@@ -1,6 +1,8 @@
-from pydantic import BaseModel
+from typing import List, Union
 
-from models.film import Film
+from pydantic import BaseModel, Field
+
+from models.film import Film, FilmShort, FilmSuggest
 
 
 class FilmResponseDto(BaseModel):
@@ -9,5 +11,18 @@ class FilmResponseDto(BaseModel):
     imdb_rating: float = 0.0
 
     @classmethod
-    def from_model(cls, model: Film):
+    def from_model(cls, model: Union[Film, FilmShort]):
         return cls(id=model.uuid, title=model.title, imdb_rating=model.rating)
+
+
+class FilmSuggestDto(BaseModel):
+    id: str
+    title: str
+
+    @classmethod
+    def from_model(cls, model: FilmSuggest):
+        return cls(id=model.uuid, title=model.title)
+
+
+class FilmBatchRequestDto(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100, description='Идентификаторы фильмов')
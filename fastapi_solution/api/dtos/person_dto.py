@@ -9,4 +9,9 @@ class PersonFilmDto(BaseModel):
 class PersonResponseDto(BaseModel):
     uuid: str
     name: str
-    films: list[PersonFilmDto]
\ No newline at end of file
+    films: list[PersonFilmDto]
+
+
+class PersonSuggestDto(BaseModel):
+    uuid: str
+    name: str
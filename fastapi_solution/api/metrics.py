@@ -0,0 +1,16 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from core.metrics import get_registry
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="Метрики Prometheus",
+    description="Счётчики и гистограммы кэша и поискового движка",
+    include_in_schema=False,
+)
+async def metrics():
+    return Response(content=generate_latest(get_registry()), media_type=CONTENT_TYPE_LATEST)
@@ -4,14 +4,16 @@ from http import HTTPStatus
 from typing import List
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import Annotated
 
-from api.dtos.film_dto import FilmResponseDto
+from api.dtos.film_dto import FilmBatchRequestDto, FilmResponseDto, FilmSuggestDto
 from models.pagination_params import PaginateQueryParams
+from models.search_params import SearchQueryParams, SuggestQueryParams
 from services.film_service import FilmService, get_film_service
 
 from core.jwt import security_jwt
+from utils.cursor import InvalidCursorError
 from utils.film_util import FilmSortEnum
 
 router = APIRouter()
@@ -21,17 +23,25 @@ router = APIRouter()
     "/",
     response_model=List[FilmResponseDto],
     summary="Получение списка фильмов",
-    description="Позволяет получить список всех фильмов",
+    description="Позволяет получить список всех фильмов, курсор следующей страницы возвращается в X-Next-Cursor",
 )
 async def get_films(pagination: Annotated[PaginateQueryParams, Depends()],
                     user: Annotated[dict, Depends(security_jwt)],
+                    response: Response,
                     sort: FilmSortEnum = '',
                     genre: UUID = '',
                     service: FilmService = Depends(get_film_service)):
     logging.debug(f"User: {user}")
-    films = await service.get_all_films(sort, genre, pagination.page_number, pagination.page_size)
+    try:
+        page = await service.get_all_films(
+            sort, genre, pagination.page_number, pagination.page_size, pagination.search_after
+        )
+    except InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='invalid cursor')
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
     return [
-        FilmResponseDto.from_model(film) for film in films
+        FilmResponseDto.from_model(film) for film in page.items
     ]
 
 
@@ -41,9 +51,36 @@ async def get_films(pagination: Annotated[PaginateQueryParams, Depends()],
     summary="Поиск фильмов",
     description="Позволяет найти фильмы по названию",
 )
-# todo pagin - 1 next previous
-async def search_films(query: str, service: FilmService = Depends(get_film_service)):
-    films = await service.search_films(query)
+async def search_films(params: Annotated[SearchQueryParams, Depends()],
+                       service: FilmService = Depends(get_film_service)):
+    films = await service.search_films(params.query, params.page_number, params.page_size)
+    return [
+        FilmResponseDto.from_model(film) for film in films
+    ]
+
+
+@router.get(
+    "/suggest",
+    response_model=List[FilmSuggestDto],
+    summary="Автодополнение названий фильмов",
+    description="Позволяет получить подсказки по началу названия фильма",
+)
+async def suggest_films(params: Annotated[SuggestQueryParams, Depends()],
+                        service: FilmService = Depends(get_film_service)):
+    films = await service.suggest_films(params.prefix, params.size)
+    return [
+        FilmSuggestDto.from_model(film) for film in films
+    ]
+
+
+@router.post(
+    "/batch",
+    response_model=List[FilmResponseDto],
+    summary="Получение фильмов по списку ID",
+    description="Позволяет получить несколько фильмов за один запрос, ненайденные ID пропускаются",
+)
+async def get_films_batch(request: FilmBatchRequestDto, service: FilmService = Depends(get_film_service)):
+    films = await service.get_films_by_ids(request.ids)
     return [
         FilmResponseDto.from_model(film) for film in films
     ]
@@ -2,11 +2,12 @@ from http import HTTPStatus
 
 from typing import List, Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 
 from api.dtos.genre_dto import GenreResponseDto
 from models.pagination_params import PaginateQueryParams
 from services.genre_service import GenreService, get_genre_service
+from utils.cursor import InvalidCursorError
 
 router = APIRouter()
 
@@ -15,11 +16,18 @@ router = APIRouter()
     "/",
     response_model=List[GenreResponseDto],
     summary="Получение списка жанров",
-    description="Позволяет получить список всех жанров",
+    description="Позволяет получить список всех жанров, курсор следующей страницы возвращается в X-Next-Cursor",
 )
 async def get_genres(pagination: Annotated[PaginateQueryParams, Depends()],
+                     response: Response,
                      service: GenreService = Depends(get_genre_service)):
-    return await service.get_all_genres(pagination.page_number, pagination.page_size)
+    try:
+        page = await service.get_all_genres(pagination.page_number, pagination.page_size, pagination.search_after)
+    except InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='invalid cursor')
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return page.items
 
 
 @router.get(
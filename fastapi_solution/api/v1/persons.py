@@ -2,11 +2,13 @@ from http import HTTPStatus
 
 from typing import List, Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 
-from api.dtos.person_dto import PersonResponseDto
+from api.dtos.person_dto import PersonResponseDto, PersonSuggestDto
 from models.pagination_params import PaginateQueryParams
+from models.search_params import SearchQueryParams, SuggestQueryParams
 from services.person_service import PersonService, get_person_service
+from utils.cursor import InvalidCursorError
 
 router = APIRouter()
 
@@ -15,11 +17,18 @@ router = APIRouter()
     "/",
     response_model=List[PersonResponseDto],
     summary="Получение списка персон",
-    description="Позволяет получить список всех персон",
+    description="Позволяет получить список всех персон, курсор следующей страницы возвращается в X-Next-Cursor",
 )
 async def get_persons(pagination: Annotated[PaginateQueryParams, Depends()],
+                      response: Response,
                       service: PersonService = Depends(get_person_service)):
-    return await service.get_all_persons(pagination.page_number, pagination.page_size)
+    try:
+        page = await service.get_all_persons(pagination.page_number, pagination.page_size, pagination.search_after)
+    except InvalidCursorError:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='invalid cursor')
+    if page.next_cursor:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return page.items
 
 
 @router.get(
@@ -28,8 +37,20 @@ async def get_persons(pagination: Annotated[PaginateQueryParams, Depends()],
     summary="Поиск персон",
     description="Позволяет найти персон по имени",
 )
-async def search_persons(query: str, service: PersonService = Depends(get_person_service)):
-    return await service.search_persons(query)
+async def search_persons(params: Annotated[SearchQueryParams, Depends()],
+                         service: PersonService = Depends(get_person_service)):
+    return await service.search_persons(params.query, params.page_number, params.page_size)
+
+
+@router.get(
+    "/suggest",
+    response_model=List[PersonSuggestDto],
+    summary="Автодополнение имён персон",
+    description="Позволяет получить подсказки по началу имени персоны",
+)
+async def suggest_persons(params: Annotated[SuggestQueryParams, Depends()],
+                          service: PersonService = Depends(get_person_service)):
+    return await service.suggest_persons(params.prefix, params.size)
 
 
 @router.get(
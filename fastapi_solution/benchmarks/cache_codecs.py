@@ -0,0 +1,87 @@
+"""Сравнение кодеков кэша на фильмах, похожих на реальные.
+
+Запуск из каталога fastapi_solution:
+
+    python -m benchmarks.cache_codecs --films 500 --rounds 20
+"""
+import argparse
+import random
+import string
+import time
+import uuid
+from typing import List
+
+from db.codecs import get_codec
+from models.film import Film
+
+CODEC_NAMES = ['json', 'orjson', 'msgpack', 'json+zstd', 'orjson+zstd', 'msgpack+zstd']
+GENRES = ['Action', 'Adventure', 'Comedy', 'Drama', 'Fantasy', 'Horror', 'Sci-Fi', 'Thriller']
+
+
+def random_words(rnd: random.Random, count: int) -> str:
+    return ' '.join(
+        ''.join(rnd.choices(string.ascii_lowercase, k=rnd.randint(3, 10))) for _ in range(count)
+    )
+
+
+def random_persons(rnd: random.Random, count: int) -> List[dict]:
+    return [
+        {'uuid': str(uuid.UUID(int=rnd.getrandbits(128))), 'name': random_words(rnd, 2).title()}
+        for _ in range(count)
+    ]
+
+
+def make_films(count: int, seed: int = 42) -> List[Film]:
+    rnd = random.Random(seed)
+    return [
+        Film(
+            uuid=str(uuid.UUID(int=rnd.getrandbits(128))),
+            title=random_words(rnd, rnd.randint(1, 5)).title(),
+            description=random_words(rnd, rnd.randint(20, 120)),
+            rating=round(rnd.uniform(1, 10), 1),
+            type='movie',
+            genres=[
+                {'uuid': str(uuid.UUID(int=rnd.getrandbits(128))), 'name': name}
+                for name in rnd.sample(GENRES, rnd.randint(1, 3))
+            ],
+            actors=random_persons(rnd, rnd.randint(5, 60)),
+            directors=random_persons(rnd, rnd.randint(1, 2)),
+            writers=random_persons(rnd, rnd.randint(1, 6)),
+        )
+        for _ in range(count)
+    ]
+
+
+def run(films: List[Film], rounds: int, threshold: int) -> None:
+    values = [film.model_dump() for film in films]
+    print(f'{"codec":<14}{"avg bytes":>12}{"total KiB":>12}{"encode us":>12}{"decode us":>12}')
+    for name in CODEC_NAMES:
+        codec = get_codec(name, compress_threshold=threshold)
+        encoded = [codec.encode(value) for value in values]
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for value in values:
+                codec.encode(value)
+        encode_time = (time.perf_counter() - started) / (rounds * len(values))
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for data in encoded:
+                Film(**codec.decode(data))
+        decode_time = (time.perf_counter() - started) / (rounds * len(values))
+
+        total = sum(len(data) for data in encoded)
+        print(
+            f'{name:<14}{total / len(encoded):>12.0f}{total / 1024:>12.1f}'
+            f'{encode_time * 1e6:>12.1f}{decode_time * 1e6:>12.1f}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark of cache codecs')
+    parser.add_argument('--films', type=int, default=500)
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--threshold', type=int, default=1024)
+    args = parser.parse_args()
+    run(make_films(args.films), args.rounds, args.threshold)
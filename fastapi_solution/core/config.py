@@ -1,5 +1,6 @@
 from functools import lru_cache
 from logging import config
+from typing import Dict, List
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +17,85 @@ class BaseConfig(BaseSettings):
 class ProjectConfig(BaseConfig):
     project_name: str = Field('movies', description='Имя проекта', alias='PROJECT_NAME')
     cache_expire: int = Field(1, description='Время жизни кэша в секундах', alias='REDIS_EXPIRE')
+    cache_stale_expire: int = Field(
+        0,
+        description='Сколько секунд после истечения cache_expire отдавать устаревшее значение, обновляя его в фоне',
+        alias='REDIS_STALE_EXPIRE',
+    )
+    cache_negative_expire: int = Field(
+        30,
+        description='Время жизни отметок о ненайденных фильмах, персонах и жанрах в секундах, 0 - отключено',
+        alias='REDIS_NEGATIVE_EXPIRE',
+    )
+    cache_search_expire: int = Field(30, description='Время жизни кэша результатов поиска в секундах',
+                                     alias='REDIS_SEARCH_EXPIRE')
+    cache_suggest_expire: int = Field(300, description='Время жизни кэша подсказок автодополнения в секундах',
+                                      alias='REDIS_SUGGEST_EXPIRE')
+    cache_xfetch_beta: float = Field(
+        1.0,
+        description='Коэффициент вероятностного досрочного обновления кэша (XFetch), 0 - отключено',
+        alias='CACHE_XFETCH_BETA',
+    )
+    cache_refresh_lock: bool = Field(
+        True, description='Брать блокировку в Redis, чтобы досрочно обновлял значение только один узел',
+        alias='CACHE_REFRESH_LOCK',
+    )
+    cache_refresh_lock_expire: int = Field(5, description='Время жизни блокировки обновления кэша в секундах',
+                                           alias='CACHE_REFRESH_LOCK_EXPIRE')
+    cache_write_behind: bool = Field(True, description='Записывать в кэш в фоне, не задерживая ответ',
+                                     alias='CACHE_WRITE_BEHIND')
+    cache_list_as_refs: bool = Field(True, description='Хранить в кэше списков только идентификаторы сущностей',
+                                     alias='CACHE_LIST_AS_REFS')
+    cache_codecs: Dict[str, str] = Field(
+        {'film_': 'orjson+zstd', 'film_short_': 'orjson', 'person_': 'orjson+zstd', 'genre_': 'orjson'},
+        description='Кодек значений кэша для каждого префикса: json, orjson, msgpack, с опциональным +zstd',
+        alias='CACHE_CODECS',
+    )
+    cache_compress_threshold: int = Field(1024, description='Минимальный размер значения в байтах для сжатия',
+                                          alias='CACHE_COMPRESS_THRESHOLD')
+    cache_compress_level: int = Field(3, description='Уровень сжатия zstd', alias='CACHE_COMPRESS_LEVEL')
+    cache_invalidation_enabled: bool = Field(True, description='Слушать события изменения контента из админки',
+                                             alias='CACHE_INVALIDATION_ENABLED')
+    cache_invalidation_channel: str = Field('movies:invalidation', description='Канал Redis с событиями изменений',
+                                            alias='CACHE_INVALIDATION_CHANNEL')
+    cache_warmup_enabled: bool = Field(True, description='Прогревать кэш при старте приложения',
+                                       alias='CACHE_WARMUP_ENABLED')
+    cache_warmup_pages: int = Field(3, description='Сколько первых страниц фильмов прогревать для каждой сортировки '
+                                                   'и жанра', alias='CACHE_WARMUP_PAGES')
+    cache_warmup_page_size: int = Field(50, description='Размер прогреваемой страницы, должен совпадать с размером '
+                                                       'страницы, который запрашивают клиенты',
+                                        alias='CACHE_WARMUP_PAGE_SIZE')
+    cache_warmup_top_films: int = Field(100, description='Сколько фильмов с наибольшим рейтингом прогревать',
+                                        alias='CACHE_WARMUP_TOP_FILMS')
+    cache_warmup_concurrency: int = Field(4, description='Максимум одновременных запросов при прогреве',
+                                          alias='CACHE_WARMUP_CONCURRENCY')
+    cache_warmup_timeout: float = Field(60, description='Максимальное время прогрева в секундах, на это же время '
+                                                        'другие воркеры отказываются от прогрева',
+                                        alias='CACHE_WARMUP_TIMEOUT')
+    genre_catalog_enabled: bool = Field(True, description='Отдавать жанры из снимка в памяти процесса',
+                                        alias='GENRE_CATALOG_ENABLED')
+    genre_catalog_refresh_interval: float = Field(
+        300, description='Как часто перечитывать снимок жанров из ES в секундах, помимо событий изменений',
+        alias='GENRE_CATALOG_REFRESH_INTERVAL',
+    )
+    local_cache_sizes: Dict[str, int] = Field(
+        {'film_': 10000, 'film_short_': 10000, 'person_': 5000, 'genre_': 1000, 'response:': 1000},
+        description='Размер in-process кэша (количество ключей) для каждого префикса, 0 - отключен',
+        alias='LOCAL_CACHE_SIZES',
+    )
+    local_cache_expire: float = Field(1.0, description='Время жизни in-process кэша в секундах',
+                                      alias='LOCAL_CACHE_EXPIRE')
+    response_cache_enabled: bool = Field(True, description='Кэшировать готовые байты GET-ответов API',
+                                         alias='RESPONSE_CACHE_ENABLED')
+    response_cache_expire: int = Field(30, description='Время жизни кэша ответов в секундах',
+                                       alias='RESPONSE_CACHE_EXPIRE')
+    response_max_age: int = Field(5, description='max-age в Cache-Control кэшируемых ответов для nginx и CDN',
+                                  alias='RESPONSE_MAX_AGE')
+    response_cache_paths: List[str] = Field(
+        ['/api/v1/films', '/api/v1/genres', '/api/v1/persons'],
+        description='Префиксы путей, ответы которых кэшируются',
+        alias='RESPONSE_CACHE_PATHS',
+    )
 
     jwt_secret_key: str = Field(..., alias="JWT_SECRET_KEY")
     jwt_algorithm: str = "HS256"
@@ -23,6 +103,14 @@ class ProjectConfig(BaseConfig):
     es_film_index: str = Field('movies', description='Индекс Elasticsearch для фильмов', alias='ELASTIC_MOVIE_INDEX')
     es_person_index: str = Field('persons', description='Индекс Elasticsearch для персон', alias='ELASTIC_PERSON_INDEX')
     es_genre_index: str = Field('genres', description='Индекс Elasticsearch для жанров', alias='ELASTIC_GENRE_INDEX')
+    es_msearch_enabled: bool = Field(False, description='Объединять конкурентные поиски в один _msearch',
+                                     alias='ELASTIC_MSEARCH_ENABLED')
+    es_msearch_window: float = Field(0.002, description='Сколько секунд копить поиски перед отправкой _msearch',
+                                     alias='ELASTIC_MSEARCH_WINDOW')
+    es_msearch_max_size: int = Field(50, description='Максимум поисков в одном _msearch',
+                                     alias='ELASTIC_MSEARCH_MAX_SIZE')
+    es_mapping_expire: float = Field(60, description='Как долго помнить маппинг индекса в секундах',
+                                     alias='ELASTIC_MAPPING_EXPIRE')
 
     def __hash__(self):
         return hash(self.project_name)
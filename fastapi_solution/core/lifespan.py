@@ -1,11 +1,18 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
 from redis.asyncio import Redis
 
-from core.config import RedisConfig, ElasticConfig
+from core.config import RedisConfig, ElasticConfig, get_project_config
 from db import redis, elastic
+from services.film_service import get_film_service
+from services.genre_catalog import get_genre_catalog
+from services.genre_service import get_genre_service
+from services.invalidation import get_cache_invalidator
+from services.warmup import CacheWarmer
+from utils.background import wait_background_tasks
 
 
 @asynccontextmanager
@@ -16,7 +23,46 @@ async def lifespan(app: FastAPI):
     esConfig = ElasticConfig()
     elastic.es = AsyncElasticsearch(hosts=[f'{esConfig.host}:{esConfig.port}'])
 
+    project_config = get_project_config()
+    # get_cache и фабрики сервисов вызываются так же, как их вызывает FastAPI,
+    # чтобы получить те же экземпляры с L1-кэшем
+    cache = redis.get_cache(config=project_config)
+
+    genre_catalog = None
+    catalog_task = None
+    if project_config.genre_catalog_enabled:
+        genre_catalog = get_genre_catalog(es=elastic.es, config=project_config)
+        # Без снимка жанры отдаются через кэш и ES, пока его не загрузит плановое обновление
+        await genre_catalog.refresh()
+        catalog_task = asyncio.create_task(genre_catalog.run())
+
+    invalidation_task = None
+    if project_config.cache_invalidation_enabled:
+        invalidator = get_cache_invalidator(cache, project_config, genre_catalog)
+        invalidation_task = asyncio.create_task(
+            invalidator.listen(redis.redis, project_config.cache_invalidation_channel)
+        )
+
+    warmup_task = None
+    if project_config.cache_warmup_enabled:
+        # Прогрев пишет только в Redis: L1 живёт секунду и к первым запросам уже пуст
+        remote_cache = cache.remote if isinstance(cache, redis.TieredCache) else cache
+        warmer = CacheWarmer(
+            get_film_service(es=elastic.es, cache=remote_cache, config=project_config),
+            get_genre_service(es=elastic.es, cache=remote_cache, config=project_config),
+            remote_cache,
+            project_config,
+        )
+        # Воркер начинает отвечать сразу, не дожидаясь прогрева
+        warmup_task = asyncio.create_task(warmer.run())
+
     yield
 
+    for task in (warmup_task, invalidation_task, catalog_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await wait_background_tasks()
     await redis.redis.close()
     await elastic.es.close()
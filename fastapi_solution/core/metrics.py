@@ -0,0 +1,35 @@
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, multiprocess
+
+LATENCY_BUCKETS = (.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+
+cache_requests = Counter(
+    'cache_requests_total', 'Обращения к кэшу', ['prefix', 'operation', 'result'],
+)
+cache_sets = Counter(
+    'cache_sets_total', 'Записи в кэш', ['prefix', 'operation'],
+)
+cache_bytes = Counter(
+    'cache_bytes_total', 'Объём прочитанных и записанных в кэш данных', ['prefix', 'direction'],
+)
+cache_operation_seconds = Histogram(
+    'cache_operation_seconds', 'Время обращений к кэшу, включая сеть до Redis', ['prefix', 'operation'],
+    buckets=LATENCY_BUCKETS,
+)
+cache_decode_seconds = Histogram(
+    'cache_decode_seconds', 'Время декодирования значений из кэша', ['prefix'], buckets=LATENCY_BUCKETS,
+)
+search_engine_seconds = Histogram(
+    'search_engine_request_seconds', 'Время запросов к поисковому движку', ['operation', 'index'],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def get_registry() -> CollectorRegistry:
+    # Под gunicorn у каждого воркера свои счётчики, их нужно собирать через общий каталог
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
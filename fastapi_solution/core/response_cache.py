@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import struct
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+import orjson
+
+from core import metrics
+from core.config import ProjectConfig, get_project_config
+from db import redis
+from db.redis import Cache
+from models.search_params import SEARCH_QUERY_MAX_LENGTH, SUGGEST_PREFIX_MAX_LENGTH, normalize_query
+from utils.background import run_in_background
+from utils.cache_keys import build_cache_key
+
+PREFIX = 'response:'
+VERSION_KEY = f'{PREFIX}version'
+# Длина заголовка с метаданными перед телом ответа
+_META_LENGTH = struct.Struct('>I')
+# Параметры, которые эндпоинты приводят к каноническому виду, и предел длины, после которого значение отклоняется
+NORMALIZED_PARAMS = {'query': SEARCH_QUERY_MAX_LENGTH, 'prefix': SUGGEST_PREFIX_MAX_LENGTH}
+# Жанры отдаются из снимка в памяти (services/genre_catalog.py): поход в Redis за ответом был бы дороже самого ответа
+GENRES_PATH = '/api/v1/genres'
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def build_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: bytes, etag: bytes) -> bool:
+    # If-None-Match сравнивается слабо: W/"x" совпадает с "x"
+    if if_none_match.strip() == b'*':
+        return True
+    candidates = (tag.strip().removeprefix(b'W/') for tag in if_none_match.split(b','))
+    return etag in candidates
+
+
+def normalize_param(name: str, value: str) -> str:
+    # Ключ строится по тому же значению, по которому ищет эндпоинт: "Star Wars" и "star  wars" - один ответ.
+    # Слишком длинное значение эндпоинт отклоняет, поэтому оно не должно совпасть с укороченным пробелами.
+    max_length = NORMALIZED_PARAMS.get(name)
+    if max_length is None or len(value) > max_length:
+        return value
+    return normalize_query(value)
+
+
+def get_header(headers: Headers, name: bytes) -> Optional[bytes]:
+    for header_name, value in headers:
+        if header_name.lower() == name:
+            return value
+    return None
+
+
+@dataclass
+class CachedResponse:
+    status: int
+    headers: Headers
+    body: bytes
+
+
+class ResponseCache:
+    """Хранит готовые байты ответов: на попадании не нужны ни pydantic, ни повторная сериализация."""
+
+    def __init__(self, cache: Cache, expire: int):
+        self.cache = cache
+        self.expire = expire
+
+    async def get_key(self, path: str, query_string: bytes) -> str:
+        # Порядок параметров не влияет на ответ, поэтому и на ключ тоже
+        params = parse_qsl(query_string.decode('latin-1'), keep_blank_values=True)
+        query = urlencode(sorted((name, normalize_param(name, value)) for name, value in params))
+        version = await self.cache.get(VERSION_KEY)
+        return f'{PREFIX}v{int(version or 0)}:{build_cache_key(f"{path}?{query}")}'
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        data = await self.cache.get(key)
+        if not data:
+            metrics.cache_requests.labels(PREFIX, 'get', 'miss').inc()
+            return None
+
+        metrics.cache_requests.labels(PREFIX, 'get', 'hit').inc()
+        metrics.cache_bytes.labels(PREFIX, 'read').inc(len(data))
+        (meta_length,) = _META_LENGTH.unpack_from(data)
+        meta = orjson.loads(data[_META_LENGTH.size:_META_LENGTH.size + meta_length])
+        headers = [(name.encode('latin-1'), value.encode('latin-1')) for name, value in meta['h']]
+        return CachedResponse(meta['s'], headers, data[_META_LENGTH.size + meta_length:])
+
+    async def set(self, key: str, response: CachedResponse) -> None:
+        meta = orjson.dumps({
+            's': response.status,
+            'h': [(name.decode('latin-1'), value.decode('latin-1')) for name, value in response.headers],
+        })
+        data = _META_LENGTH.pack(len(meta)) + meta + response.body
+        metrics.cache_sets.labels(PREFIX, 'set').inc()
+        metrics.cache_bytes.labels(PREFIX, 'write').inc(len(data))
+        await self.cache.set(key, data, self.expire)
+
+    async def invalidate(self) -> None:
+        version = await self.cache.incr(VERSION_KEY)
+        logging.info(f'invalidate cached responses, new version: {version}')
+
+
+def build_response_cache(cache: Cache, config: ProjectConfig) -> ResponseCache:
+    return ResponseCache(cache, config.response_cache_expire)
+
+
+class ResponseCacheMiddleware:
+    """Отдаёт GET-ответы API из кэша байтами, минуя эндпоинт целиком.
+
+    Успешные ответы получают строгий ETag от тела и Cache-Control, а запрос с совпавшим
+    If-None-Match получает 304 без тела, в том числе прямо из кэша.
+    """
+
+    def __init__(self, app, config: Optional[ProjectConfig] = None):
+        self.app = app
+        self.config = config or get_project_config()
+        self._response_cache: Optional[ResponseCache] = None
+
+    @property
+    def response_cache(self) -> ResponseCache:
+        # Кэш создаётся при первом запросе: клиент Redis появляется только в lifespan
+        if self._response_cache is None:
+            self._response_cache = build_response_cache(redis.get_cache(config=self.config), self.config)
+        return self._response_cache
+
+    def is_cacheable(self, scope) -> bool:
+        return (
+            scope['type'] == 'http'
+            and scope['method'] == 'GET'
+            and scope['path'].startswith(tuple(self.config.response_cache_paths))
+        )
+
+    def uses_response_cache(self, path: str) -> bool:
+        if self.config.genre_catalog_enabled and path.startswith(GENRES_PATH):
+            return False
+        return self.config.response_cache_enabled
+
+    async def __call__(self, scope, receive, send):
+        if not self.is_cacheable(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = get_header(scope['headers'], b'if-none-match')
+        key = None
+        # ETag и 304 работают и без кэша ответов, просто тело тогда собирается заново
+        if self.uses_response_cache(scope['path']):
+            key = await self.response_cache.get_key(scope['path'], scope['query_string'])
+            cached = await self.response_cache.get(key)
+            if cached is not None:
+                await self.send_response(send, cached, if_none_match)
+                return
+
+        response = CachedResponse(0, [], b'')
+        body = []
+
+        async def capture(message):
+            if message['type'] == 'http.response.start':
+                response.status = message['status']
+                response.headers = list(message.get('headers', []))
+                if response.status != 200:
+                    await send(message)
+            elif message['type'] == 'http.response.body' and response.status == 200:
+                # Заголовки уходят только вместе с телом: ETag считается по всему ответу
+                body.append(message.get('body', b''))
+                if not message.get('more_body', False):
+                    response.body = b''.join(body)
+                    response.headers.extend(self.get_validators(response.body))
+                    await self.send_response(send, response, if_none_match)
+            else:
+                await send(message)
+
+        await self.app(scope, receive, capture)
+        if response.status == 200 and key is not None:
+            run_in_background(self.response_cache.set(key, response))
+
+    def get_validators(self, body: bytes) -> Headers:
+        return [
+            (b'etag', build_etag(body)),
+            (b'cache-control', f'public, max-age={self.config.response_max_age}'.encode()),
+        ]
+
+    @staticmethod
+    async def send_response(send, response: CachedResponse, if_none_match: Optional[bytes] = None) -> None:
+        etag = get_header(response.headers, b'etag')
+        if if_none_match and etag and etag_matches(if_none_match, etag):
+            headers = [(name, value) for name, value in response.headers if name in (b'etag', b'cache-control')]
+            await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        await send({'type': 'http.response.start', 'status': response.status, 'headers': response.headers})
+        await send({'type': 'http.response.body', 'body': response.body})
@@ -0,0 +1,96 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+
+import msgpack
+import orjson
+import zstandard
+
+# Кадр zstd всегда начинается с этого magic number, а JSON/msgpack-представление
+# словаря или списка - никогда, поэтому сжатые и несжатые значения различимы без заголовка.
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+
+class Codec(ABC):
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        pass
+
+
+class JsonCodec(Codec):
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value).encode()
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(Codec):
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(Codec):
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class ZstdCodec(Codec):
+    """Сжимает результат вложенного кодека, если он не меньше порога."""
+
+    def __init__(self, codec: Codec, threshold: int = 1024, level: int = 3):
+        self.codec = codec
+        self.threshold = threshold
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, value: Any) -> bytes:
+        data = self.codec.encode(value)
+        if len(data) < self.threshold:
+            return data
+        return self.compressor.compress(data)
+
+    def decode(self, data: bytes) -> Any:
+        if data[:4] == ZSTD_MAGIC:
+            data = self.decompressor.decompress(data)
+        return self.codec.decode(data)
+
+
+CODECS = {
+    'json': JsonCodec,
+    'orjson': OrjsonCodec,
+    'msgpack': MsgpackCodec,
+}
+
+
+def get_codec(name: str, compress_threshold: int = 1024, compress_level: int = 3) -> Codec:
+    """Создаёт кодек по имени вида `orjson` или `msgpack+zstd`."""
+    base_name, _, compression = name.partition('+')
+    if base_name not in CODECS:
+        raise ValueError(f'unknown cache codec: {name}')
+
+    codec = CODECS[base_name]()
+    if not compression:
+        return codec
+    if compression != 'zstd':
+        raise ValueError(f'unknown cache compression: {name}')
+    return ZstdCodec(codec, threshold=compress_threshold, level=compress_level)
+
+
+def get_codec_name(codecs: Dict[str, str], prefix: str, default: str = 'orjson') -> str:
+    """Находит кодек для префикса кэша по самому длинному совпадающему префиксу."""
+    matched: Optional[str] = None
+    for codec_prefix in codecs:
+        if prefix.startswith(codec_prefix) and (matched is None or len(codec_prefix) > len(matched)):
+            matched = codec_prefix
+    return codecs[matched] if matched is not None else default
@@ -1,13 +1,22 @@
+import copy
+import time
 from abc import ABC, abstractmethod, ABCMeta
-from typing import Optional, List
+from contextlib import contextmanager
+from typing import Dict, Optional, List
 
 from elasticsearch import AsyncElasticsearch
 
+from core import metrics
 from core.config import ProjectConfig
+from db.msearch import get_search_batcher
+from utils.cursor import InvalidCursorError
 from utils.film_util import BaseSortEnum
 
 es: Optional[AsyncElasticsearch] = None
 
+# Уникальное поле, которое замыкает любую сортировку, чтобы порядок и search_after были однозначными
+TIEBREAKER = {"uuid": "asc"}
+
 
 # Функция понадобится при внедрении зависимостей
 async def get_elastic() -> Optional[AsyncElasticsearch]:
@@ -23,17 +32,74 @@ class SearchEngine(ABC):
     async def get(self, index=None, id: str = None):
         pass
 
+    @abstractmethod
+    async def mget(self, index=None, ids: List[str] = None, source_includes: Optional[List[str]] = None):
+        pass
+
+    @abstractmethod
+    async def get_field_types(self, index=None) -> Dict[str, str]:
+        pass
+
+
+def flatten_mapping(properties: dict, path: str = '') -> Dict[str, str]:
+    """Типы полей маппинга по полным путям, включая подполя: {'title': 'text', 'title.suggest': ...}."""
+    types = {}
+    for name, field in properties.items():
+        field_path = f'{path}{name}'
+        types[field_path] = field.get('type', 'object')
+        types.update(flatten_mapping(field.get('properties', {}), f'{field_path}.'))
+        types.update(flatten_mapping(field.get('fields', {}), f'{field_path}.'))
+    return types
+
 
 class ElasticSearch(SearchEngine):
     def __init__(self, es: AsyncElasticsearch, config: ProjectConfig):
         self.es = es
         self.config = config
+        self.batcher = None
+        # Маппинг меняется только переиндексацией, поэтому он перечитывается не чаще раза в es_mapping_expire секунд
+        self._field_types: Dict[str, tuple] = {}
+        if config.es_msearch_enabled:
+            self.batcher = get_search_batcher(es, config.es_msearch_window, config.es_msearch_max_size)
 
     async def search(self, index=None, body: dict = None) -> List:
-        return await self.es.search(index, body)
+        with self._observe('search', index):
+            if self.batcher is not None:
+                return await self.batcher.search(index, body)
+            return await self.es.search(index=index, body=body)
 
     async def get(self, index=None, id: str = None) -> dict:
-        return await self.es.get(index, id)
+        with self._observe('get', index):
+            return await self.es.get(index=index, id=id)
+
+    async def mget(self, index=None, ids: List[str] = None, source_includes: Optional[List[str]] = None) -> dict:
+        with self._observe('mget', index):
+            return await self.es.mget(index=index, ids=ids, source_includes=source_includes)
+
+    async def get_field_types(self, index=None) -> Dict[str, str]:
+        loaded_at, types = self._field_types.get(index, (None, None))
+        if loaded_at is not None and time.monotonic() - loaded_at < self.config.es_mapping_expire:
+            return types
+
+        with self._observe('get_mapping', index):
+            response = await self.es.indices.get_mapping(index=index)
+        # За алиасом во время переиндексации может быть несколько индексов: поле есть, только если оно есть во всех
+        mappings = [flatten_mapping(info['mappings'].get('properties', {})) for info in response.values()]
+        types = {
+            path: field_type for path, field_type in mappings[0].items()
+            if all(mapping.get(path) == field_type for mapping in mappings[1:])
+        } if mappings else {}
+        self._field_types[index] = (time.monotonic(), types)
+        return types
+
+    @staticmethod
+    @contextmanager
+    def _observe(operation: str, index):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.search_engine_seconds.labels(operation, index).observe(time.perf_counter() - started)
 
 
 class SearchSortMixin(ABC):
@@ -46,7 +112,7 @@ class SearchSortMixin(ABC):
 class ElasticSearchSortMixin(SearchSortMixin):
     @staticmethod
     def sort(request_body: dict, sort: BaseSortEnum) -> dict:
-        request_body["sort"] = sort.to_elasticsearch()
+        request_body["sort"] = [sort.to_elasticsearch(), TIEBREAKER]
         return request_body
 
 
@@ -58,29 +124,66 @@ class SearchFilterMixin(ABC):
 
     @staticmethod
     @abstractmethod
-    def related_filter(
-        request_body: {}, related_field: str, inner_field: str, filter_value: str
-    ) -> dict:
+    def prefix_filter(request_body, field, value, n_grams: bool = True):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def related_filter(request_body: {}, related_field: str, inner_field: str, filter_value: str) -> dict:
 
         pass
 
 
 class ElasticSearchFilterMixin(SearchFilterMixin):
+    @staticmethod
+    def _get_bool_query(request_body) -> dict:
+        query = request_body.get("query") or {}
+        if "bool" not in query:
+            query = {"bool": {"must": [query]} if query and "match_all" not in query else {}}
+            request_body["query"] = query
+        return query["bool"]
+
     @staticmethod
     def filter(request_body, field, value):
-        return {"query": {"match": {field: value}}}
+        # Полнотекстовое совпадение влияет на релевантность, поэтому идёт в must и задаёт порядок по умолчанию
+        ElasticSearchFilterMixin._get_bool_query(request_body).setdefault("must", []).append(
+            {"match": {field: value}}
+        )
+        request_body.setdefault("sort", [{"_score": "desc"}, TIEBREAKER])
+        return request_body
 
     @staticmethod
-    def related_filter(
-        request_body, related_field: str, inner_field: str, filter_value: str
-    ):
-        request_body["query"] = {
-            "nested": {
-                "path": related_field,
-                "query": {"term": {f"{related_field}.{inner_field}": filter_value}},
-                "inner_hits": {},
+    def prefix_filter(request_body, field, value, n_grams: bool = True):
+        if n_grams:
+            # У field есть подполе suggest типа search_as_you_type: последнее слово ищется по префиксу,
+            # остальные - по n-граммам
+            query = {
+                "multi_match": {
+                    "query": value,
+                    "type": "bool_prefix",
+                    "fields": [f"{field}.suggest", f"{field}.suggest._2gram", f"{field}.suggest._3gram"],
+                }
             }
-        }
+        else:
+            # Индекс ещё не переиндексирован под схему с подполем: тот же запрос по терминам самого поля
+            query = {"match_bool_prefix": {field: value}}
+        ElasticSearchFilterMixin._get_bool_query(request_body).setdefault("must", []).append(query)
+        request_body.setdefault("sort", [{"_score": "desc"}, TIEBREAKER])
+        return request_body
+
+    @staticmethod
+    def related_filter(request_body, related_field: str, inner_field: str, filter_value: str):
+        # Точные условия идут в filter: ES их не оценивает и кэширует. Связанные сущности в схеме
+        # (db/schema.py) - обычные объекты, но индексы до переиндексации ещё с nested-маппингом, где term
+        # по полю вложенного документа ничего не находит. Поэтому условие двойное: nested с ignore_unmapped
+        # для старых индексов (на объектном пути он ничего не находит) и term для новых
+        term = {"term": {f"{related_field}.{inner_field}": filter_value}}
+        ElasticSearchFilterMixin._get_bool_query(request_body).setdefault("filter", []).append(
+            {"bool": {
+                "should": [{"nested": {"path": related_field, "query": term, "ignore_unmapped": True}}, term],
+                "minimum_should_match": 1,
+            }}
+        )
         return request_body
 
 
@@ -102,10 +205,32 @@ class SearchEngineService(ABC):
     async def get(self, id):
         pass
 
+    @abstractmethod
+    async def mget(self, ids: List[str], source: Optional[List[str]] = None):
+        pass
+
+    @abstractmethod
+    async def get_field_type(self, field: str) -> Optional[str]:
+        pass
+
     @abstractmethod
     def paginate(self, request_body, from_, size):
         pass
 
+    @abstractmethod
+    def paginate_after(self, request_body, search_after: Optional[List], size):
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def get_search_after(request_body, source: dict) -> List:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def source(request_body, fields: List[str]):
+        pass
+
     @staticmethod
     @abstractmethod
     def get_raw_list_response(es_response):
@@ -116,14 +241,20 @@ class SearchEngineService(ABC):
     def get_raw_retrieve_response(es_response):
         pass
 
+    @staticmethod
+    @abstractmethod
+    def get_raw_mget_response(es_response):
+        pass
+
     def get_request_body(
         self,
     ):
-        return self.raw_request_body.copy()
+        # Вложенные условия дополняются на месте, поэтому шаблон копируется целиком
+        return copy.deepcopy(self.raw_request_body)
 
 
 class ElasticSearchService(SearchEngineService):
-    raw_request_body = {"query": {"match_all": {}}}
+    raw_request_body = {"query": {"bool": {}}}
 
     async def search(self, body):
         return await self.search_engine.search(index=self.index, body=body)
@@ -131,9 +262,34 @@ class ElasticSearchService(SearchEngineService):
     async def get(self, id):
         return await self.search_engine.get(index=self.index, id=id)
 
+    async def mget(self, ids, source=None):
+        return await self.search_engine.mget(index=self.index, ids=ids, source_includes=source)
+
+    async def get_field_type(self, field):
+        return (await self.search_engine.get_field_types(index=self.index)).get(field)
+
     def paginate(self, request_body, page, size):
         request_body["from"] = (page - 1) * size
         request_body["size"] = size
+        request_body.setdefault("sort", [TIEBREAKER])
+
+    def paginate_after(self, request_body, search_after, size):
+        # Курсор вместо from/size: глубокие страницы не упираются в index.max_result_window
+        request_body["size"] = size
+        sort = request_body.setdefault("sort", [TIEBREAKER])
+        if search_after:
+            if len(search_after) != len(sort):
+                raise InvalidCursorError(f'cursor does not match sort: {search_after}')
+            request_body["search_after"] = search_after
+
+    @staticmethod
+    def get_search_after(request_body, source):
+        return [source.get(field) for item in request_body["sort"] for field in item]
+
+    @staticmethod
+    def source(request_body, fields):
+        request_body["_source"] = fields
+        return request_body
 
     @staticmethod
     def get_raw_list_response(es_response):
@@ -143,6 +299,10 @@ class ElasticSearchService(SearchEngineService):
     def get_raw_retrieve_response(es_response):
         return es_response["_source"]
 
+    @staticmethod
+    def get_raw_mget_response(es_response):
+        return [doc["_source"] for doc in es_response["docs"] if doc.get("found")]
+
 
 class FilmSearchEngineService(
     SearchEngineService, SearchSortMixin, SearchFilterMixin, metaclass=ABCMeta
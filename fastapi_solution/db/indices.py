@@ -0,0 +1,100 @@
+"""Создание и проверка индексов Elasticsearch по схеме из db/schema.py.
+
+Запуск из каталога fastapi_solution:
+
+    python -m db.indices apply   # шаблоны индексов и недостающие индексы
+    python -m db.indices check   # расхождения живых индексов со схемой, код возврата 1 при расхождении
+
+Схема хранится в ES как шаблон индексов {alias}_v*: по нему создаётся первая версия индекса
+и каждая следующая при переиндексации (etl/reindex.py), а сервис работает с алиасом.
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from elasticsearch import AsyncElasticsearch, NotFoundError
+
+from core.config import ElasticConfig, ProjectConfig, get_project_config
+from db.schema import find_drift, get_index_schemas
+
+
+class IndexManager:
+    def __init__(self, es: AsyncElasticsearch, schemas: Dict[str, dict]):
+        self.es = es
+        self.schemas = schemas
+
+    async def apply(self) -> None:
+        for alias, schema in self.schemas.items():
+            await self.es.indices.put_index_template(
+                name=alias,
+                index_patterns=[f'{alias}_v*'],
+                template={'settings': schema['settings'], 'mappings': schema['mappings']},
+            )
+            if await self.es.indices.exists(index=alias):
+                # Живой индекс не пересоздаётся: новая схема доезжает до него переиндексацией
+                logging.info(f'{alias} exists, template updated')
+                continue
+
+            index = f'{alias}_v{datetime.now(timezone.utc):%Y%m%d%H%M%S}'
+            await self.es.indices.create(index=index, aliases={alias: {}})
+            logging.info(f'created {index} as {alias}')
+
+    async def check(self) -> Dict[str, List[str]]:
+        return {alias: await self.check_index(alias, schema) for alias, schema in self.schemas.items()}
+
+    async def check_index(self, alias: str, schema: dict) -> List[str]:
+        try:
+            response = await self.es.indices.get(index=alias)
+        except NotFoundError:
+            return ['index not found']
+
+        drift = []
+        for index, info in response.items():
+            if index == alias:
+                drift.append(f'{index}: bare index instead of alias, reindex to switch to versions')
+            drift.extend(f'{index}: {line}' for line in self.compare(schema, info))
+
+        try:
+            templates = await self.es.indices.get_index_template(name=alias)
+        except NotFoundError:
+            drift.append('template not found, run apply')
+        else:
+            template = templates['index_templates'][0]['index_template']['template']
+            drift.extend(f'template: {line}' for line in self.compare(schema, template))
+        return drift
+
+    @staticmethod
+    def compare(schema: dict, actual: dict) -> List[str]:
+        # Настройки ES отдаёт вложенными в index
+        settings = actual.get('settings', {})
+        return [
+            *(f'settings.{line}' for line in find_drift(schema['settings'], settings.get('index', settings))),
+            *(f'mappings.{line}' for line in find_drift(schema['mappings'], actual.get('mappings', {}))),
+        ]
+
+
+async def main(command: str, config: ProjectConfig) -> int:
+    es_config = ElasticConfig()
+    async with AsyncElasticsearch(hosts=[f'{es_config.host}:{es_config.port}']) as es:
+        manager = IndexManager(es, get_index_schemas(config))
+        if command == 'apply':
+            await manager.apply()
+            return 0
+
+        has_drift = False
+        for alias, drift in (await manager.check()).items():
+            for line in drift:
+                print(f'{alias}: {line}')
+            has_drift = has_drift or bool(drift)
+            if not drift:
+                print(f'{alias}: ok')
+        return int(has_drift)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Индексы Elasticsearch по схеме сервиса')
+    parser.add_argument('command', choices=['apply', 'check'])
+    sys.exit(asyncio.run(main(parser.parse_args().command, get_project_config())))
@@ -0,0 +1,84 @@
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from core import metrics
+from utils.background import run_in_background
+
+
+class MultiSearchError(Exception):
+    """Ошибка отдельного поиска внутри _msearch."""
+
+    def __init__(self, status: int, error: dict):
+        super().__init__(f'{status}: {error}')
+        self.status = status
+        self.error = error
+
+
+class MultiSearchBatcher:
+    """Собирает поиски, пришедшие в течение короткого окна, в один запрос _msearch.
+
+    Первый поиск в пустой пачке запускает таймер на window секунд, пачка уходит по таймеру
+    или как только наберётся max_size поисков. Ответы раздаются ожидающим корутинам по порядку.
+    """
+
+    def __init__(self, es: AsyncElasticsearch, window: float, max_size: int):
+        self.es = es
+        self.window = window
+        self.max_size = max_size
+        self._pending: List[Tuple[Optional[str], dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def search(self, index: Optional[str], body: dict) -> dict:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((index, body, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            run_in_background(self._send(batch))
+
+    async def _send(self, batch: List[Tuple[Optional[str], dict, asyncio.Future]]) -> None:
+        searches = []
+        for index, body, _ in batch:
+            searches.extend([{'index': index}, body])
+
+        started = time.perf_counter()
+        try:
+            response = await self.es.msearch(searches=searches)
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            metrics.search_engine_seconds.labels('msearch', '_all').observe(time.perf_counter() - started)
+
+        logging.debug('msearch sent %s searches', len(batch))
+        for (*_, future), item in zip(batch, response['responses']):
+            # Ожидающий мог быть отменён, пока пачка была в пути
+            if future.done():
+                continue
+            if 'error' in item:
+                future.set_exception(MultiSearchError(item.get('status', 500), item['error']))
+            else:
+                future.set_result(item)
+
+
+@lru_cache()
+def get_search_batcher(es: AsyncElasticsearch, window: float, max_size: int) -> MultiSearchBatcher:
+    # Одна пачка на процесс для всех сервисов, иначе окна фильмов, персон и жанров не пересекаются
+    return MultiSearchBatcher(es, window, max_size)
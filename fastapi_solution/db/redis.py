@@ -1,25 +1,57 @@
-import json
 import logging
+import math
+import random
+import time
 from abc import abstractmethod, ABC
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
 from functools import lru_cache
-from typing import Optional, Union, List, Type
+from typing import Optional, Union, List, Type, Dict, Tuple, Callable, Awaitable, Any
 
 from fastapi import Depends
 from pydantic import BaseModel
 from redis.asyncio import Redis
 
+from core import metrics
 from core.config import ProjectConfig, get_project_config
+from db.codecs import Codec, OrjsonCodec, get_codec, get_codec_name
+from utils.cache_keys import build_cache_key
 
 redis: Optional[Redis] = None
 
 
 class Cache(ABC):
     @abstractmethod
-    async def get(self, key: str) -> str:
+    async def get(self, key: str) -> Optional[bytes]:
         pass
 
     @abstractmethod
-    async def set(self, key: str, value: str) -> None:
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def set_many(self, items: Dict[str, bytes], expire: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        pass
+
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        pass
+
+    @abstractmethod
+    async def delete(self, keys: List[str]) -> None:
+        pass
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, expire: int) -> bool:
+        pass
+
+    @abstractmethod
+    async def release_lock(self, key: str) -> None:
         pass
 
 
@@ -28,90 +60,493 @@ class RedisCache(Cache):
         self.redis = redis
         self.config = config
 
-    async def get(self, key: str) -> str:
+    async def get(self, key: str) -> Optional[bytes]:
         return await self.redis.get(key)
 
-    async def set(self, key: str, value: str) -> None:
-        await self.redis.set(key, value, ex=self.config.cache_expire)
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self.redis.set(key, value, ex=expire or self.config.cache_expire)
+
+    async def set_many(self, items: Dict[str, bytes], expire: Optional[int] = None) -> None:
+        # MSET не умеет TTL, поэтому отправляем SET EX всех ключей одним пайплайном
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in items.items():
+                pipe.set(key, value, ex=expire or self.config.cache_expire)
+            await pipe.execute()
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        if not keys:
+            return []
+        return await self.redis.mget(keys)
+
+    async def incr(self, key: str) -> int:
+        return await self.redis.incr(key)
+
+    async def delete(self, keys: List[str]) -> None:
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def acquire_lock(self, key: str, expire: int) -> bool:
+        return bool(await self.redis.set(f'lock:{key}', b'1', nx=True, ex=expire))
+
+    async def release_lock(self, key: str) -> None:
+        await self.redis.delete(f'lock:{key}')
+
+
+class LocalCache(Cache):
+    """In-process LRU-кэш с ограничением по количеству ключей и времени жизни записей."""
+
+    def __init__(self, max_size: int, expire: float):
+        self.max_size = max_size
+        self.expire = expire
+        self._data: OrderedDict[str, Tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        local_expire = min(self.expire, expire) if expire else self.expire
+        self._data[key] = (time.monotonic() + local_expire, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    async def set_many(self, items: Dict[str, bytes], expire: Optional[int] = None) -> None:
+        for key, value in items.items():
+            await self.set(key, value, expire)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        return [await self.get(key) for key in keys]
+
+    async def incr(self, key: str) -> int:
+        value = int(await self.get(key) or 0) + 1
+        await self.set(key, str(value).encode())
+        return value
+
+    async def delete(self, keys: List[str]) -> None:
+        for key in keys:
+            self._data.pop(key, None)
+
+    async def acquire_lock(self, key: str, expire: int) -> bool:
+        if await self.get(f'lock:{key}') is not None:
+            return False
+        await self.set(f'lock:{key}', b'1', expire)
+        return True
+
+    async def release_lock(self, key: str) -> None:
+        self._data.pop(f'lock:{key}', None)
+
+
+class TieredCache(Cache):
+    """Двухуровневый кэш: in-process L1 для каждого префикса перед общим L2 (Redis)."""
+
+    def __init__(self, remote: Cache, local_caches: Dict[str, LocalCache]):
+        self.remote = remote
+        # Более длинные префиксы проверяются первыми
+        self.local_caches = sorted(local_caches.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def get_local(self, key: str) -> Optional[LocalCache]:
+        for prefix, local_cache in self.local_caches:
+            if key.startswith(prefix):
+                return local_cache
+        return None
+
+    async def get(self, key: str) -> Optional[bytes]:
+        local_cache = self.get_local(key)
+        if local_cache is not None:
+            value = await local_cache.get(key)
+            if value is not None:
+                return value
+
+        value = await self.remote.get(key)
+        if value is not None and local_cache is not None:
+            await local_cache.set(key, value)
+        return value
+
+    async def set(self, key: str, value: bytes, expire: Optional[int] = None) -> None:
+        await self.remote.set(key, value, expire)
+        if (local_cache := self.get_local(key)) is not None:
+            await local_cache.set(key, value, expire)
+
+    async def set_many(self, items: Dict[str, bytes], expire: Optional[int] = None) -> None:
+        await self.remote.set_many(items, expire)
+        for key, value in items.items():
+            if (local_cache := self.get_local(key)) is not None:
+                await local_cache.set(key, value, expire)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[bytes]]:
+        values: Dict[str, Optional[bytes]] = {}
+        remote_keys = []
+        for key in keys:
+            local_cache = self.get_local(key)
+            value = await local_cache.get(key) if local_cache is not None else None
+            if value is None:
+                remote_keys.append(key)
+            values[key] = value
+
+        for key, value in zip(remote_keys, await self.remote.get_many(remote_keys)):
+            values[key] = value
+            if value is not None and (local_cache := self.get_local(key)) is not None:
+                await local_cache.set(key, value)
+        return [values[key] for key in keys]
+
+    async def incr(self, key: str) -> int:
+        value = await self.remote.incr(key)
+        if (local_cache := self.get_local(key)) is not None:
+            await local_cache.set(key, str(value).encode())
+        return value
+
+    async def delete(self, keys: List[str]) -> None:
+        await self.remote.delete(keys)
+        for key in keys:
+            if (local_cache := self.get_local(key)) is not None:
+                await local_cache.delete([key])
+
+    async def acquire_lock(self, key: str, expire: int) -> bool:
+        # Блокировка имеет смысл только общая для всех воркеров
+        return await self.remote.acquire_lock(key, expire)
+
+    async def release_lock(self, key: str) -> None:
+        await self.remote.release_lock(key)
+
+
+IdsLoader = Callable[[List[str]], Awaitable[List[BaseModel]]]
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    # Мягкий TTL истёк: значение ещё можно отдавать, но его пора обновить
+    stale: bool = False
 
 
 class CacheService(ABC):
-    def __init__(self, cache: Cache, prefix: str, model: Type[BaseModel], field_pk: str = 'uuid'):
+    def __init__(
+            self,
+            cache: Cache,
+            prefix: str,
+            model: Type[BaseModel],
+            field_pk: str = 'uuid',
+            list_as_refs: bool = False,
+            codec: Optional[Codec] = None,
+            expire: Optional[int] = None,
+            stale_expire: int = 0,
+            xfetch_beta: float = 0.0,
+            negative_expire: int = 0,
+    ):
         self.cache = cache
         self.prefix = prefix
         self.model = model
         self.field_pk = field_pk
+        self.codec = codec or OrjsonCodec()
+        # Хранить в списках только идентификаторы, а сущности - под собственными ключами
+        self.list_as_refs = list_as_refs
+        # expire - мягкий TTL, после него значение ещё stale_expire секунд отдаётся как устаревшее
+        self.expire = expire
+        self.stale_expire = stale_expire
+        # Коэффициент вероятностного досрочного обновления (XFetch), 0 - отключено
+        self.xfetch_beta = xfetch_beta
+        # Время жизни отметок об отсутствующих сущностях, 0 - не кэшировать промахи
+        self.negative_expire = negative_expire
 
     @abstractmethod
     def get_cache_key(self, obj_id: Union[str, dict, list]) -> str:
         pass
 
     @abstractmethod
-    async def get(self, obj_id: str) -> Union[BaseModel, None]:
+    def get_list_key(self, queries_dict: Union[str, dict, list]) -> str:
         pass
 
     @abstractmethod
-    async def get_list(self, queries_dict: Union[str, dict, list]) -> Optional[List[BaseModel]]:
+    async def invalidate_lists(self) -> None:
         pass
 
     @abstractmethod
-    async def set(self, obj_id: str, value: Union[BaseModel, List[BaseModel]]) -> None:
+    async def invalidate(self, obj_ids: List[str]) -> None:
         pass
 
     @abstractmethod
-    async def set_list(self, queries_dict: Union[str, dict, list], values: List[BaseModel]) -> None:
+    async def set_missing(self, obj_id: str) -> None:
+        pass
+
+    @abstractmethod
+    async def get_entry(self, obj_id: str) -> Optional[CacheEntry]:
+        pass
+
+    @abstractmethod
+    async def get_list_entry(
+            self, queries_dict: Union[str, dict, list], loader: Optional[IdsLoader] = None
+    ) -> Optional[CacheEntry]:
+        pass
+
+    @abstractmethod
+    async def get_many(self, obj_ids: List[str], loader: IdsLoader) -> List[BaseModel]:
+        pass
+
+    async def get(self, obj_id: str) -> Union[BaseModel, None]:
+        entry = await self.get_entry(obj_id)
+        return entry.value if entry is not None else None
+
+    async def get_list(
+            self, queries_dict: Union[str, dict, list], loader: Optional[IdsLoader] = None
+    ) -> Optional[List[BaseModel]]:
+        entry = await self.get_list_entry(queries_dict, loader)
+        return entry.value if entry is not None else None
+
+    @abstractmethod
+    async def set(self, obj_id: str, value: Union[BaseModel, List[BaseModel]], cost: float = 0.0) -> None:
+        pass
+
+    @abstractmethod
+    async def set_list(
+            self, queries_dict: Union[str, dict, list], values: List[BaseModel], cost: float = 0.0
+    ) -> None:
         pass
 
 
 class CacheServiceImpl(CacheService):
+    # Вид ключа стоит сразу после префикса и заканчивается двоеточием, а идентификатор идёт после него.
+    # Поэтому ни идентификатор (например, short_<uuid> или list:version), ни префикс film_ рядом с film_short_
+    # не могут дать ключ другого вида или другого сервиса.
+
     def get_cache_key(self, obj_id: Union[str, dict, list]) -> str:
         if not obj_id:
             logging.warning(f'obj_id is None: {obj_id} with prefix: {self.prefix}')
 
-        key = obj_id
-        if not isinstance(obj_id, str):
-            key = json.dumps(obj_id)
-
-        return f'{self.prefix}{key}'
-
-    async def get(self, obj_id: str) -> Union[BaseModel, None]:
+        return f'{self.prefix}id:{build_cache_key(obj_id)}'
+
+    def get_list_key(self, queries_dict: Union[str, dict, list]) -> str:
+        return f'{self.prefix}list:{build_cache_key(queries_dict)}'
+
+    def get_missing_key(self, obj_id: str) -> str:
+        return f'{self.prefix}404:{build_cache_key(obj_id)}'
+
+    @property
+    def list_version_key(self) -> str:
+        return f'{self.prefix}version:list'
+
+    async def get_versioned_list_key(self, queries_dict: Union[str, dict, list]) -> str:
+        # Версия пространства имён списков: её увеличение разом делает все старые страницы недостижимыми
+        with self._observe('get'):
+            version = await self.cache.get(self.list_version_key)
+        return f'{self.prefix}list:v{int(version or 0)}:{build_cache_key(queries_dict)}'
+
+    async def invalidate_lists(self) -> None:
+        with self._observe('incr'):
+            version = await self.cache.incr(self.list_version_key)
+        logging.info(f'invalidate lists with prefix: {self.prefix}, new version: {version}')
+
+    async def invalidate(self, obj_ids: List[str]) -> None:
+        logging.info(f'invalidate {len(obj_ids)} keys with prefix: {self.prefix}')
+        keys = [self.get_cache_key(obj_id) for obj_id in obj_ids]
+        keys.extend(self.get_missing_key(obj_id) for obj_id in obj_ids)
+        with self._observe('delete'):
+            await self.cache.delete(keys)
+
+    async def set_missing(self, obj_id: str) -> None:
+        if not self.negative_expire:
+            return
+        # Положительная запись проверяется первой, поэтому её нужно убрать
+        with self._observe('delete'):
+            await self.cache.delete([self.get_cache_key(obj_id)])
+        with self._observe('set'):
+            await self.cache.set(self.get_missing_key(obj_id), b'1', self.negative_expire)
+
+    async def get_entry(self, obj_id: str) -> Optional[CacheEntry]:
         key = self.get_cache_key(obj_id)
-        cached_response = await self.cache.get(key)
-        if cached_response:
-            logging.info(f'found `get` cache key: {key}')
-            return self.model(**json.loads(cached_response))
-
-        logging.info(f'not found `get` cache key: {key}')
+        if self.negative_expire:
+            # Сущность и отметка об её отсутствии читаются за один MGET
+            with self._observe('get_many'):
+                cached_response, missing = await self.cache.get_many([key, self.get_missing_key(obj_id)])
+        else:
+            with self._observe('get'):
+                cached_response, missing = await self.cache.get(key), None
+        entry = self._unpack(cached_response) if cached_response else None
+        if entry is not None:
+            logging.debug('found `get` cache key: %s', key)
+            entry.value = self.model(**entry.value)
+            self._count_request('get', entry)
+            return entry
+        if missing:
+            logging.debug('found negative cache key: %s', key)
+            metrics.cache_requests.labels(self.prefix, 'get', 'negative').inc()
+            return CacheEntry(None)
+
+        logging.debug('not found `get` cache key: %s', key)
+        self._count_request('get', None)
         return None
 
-    async def get_list(self, queries_dict: Union[str, dict, list]) -> Optional[List[BaseModel]]:
-        key = self.get_cache_key(queries_dict)
-        cached_response = await self.cache.get(key)
-        if cached_response:
-            cached = json.loads(cached_response)
-            if isinstance(cached, list):
-                logging.info(f'found cache key: {key}')
-                return [self.model(**res) for res in cached]
-
-        logging.info(f'not found `get_list` cache key: {key}')
+    async def get_list_entry(
+            self, queries_dict: Union[str, dict, list], loader: Optional[IdsLoader] = None
+    ) -> Optional[CacheEntry]:
+        key = await self.get_versioned_list_key(queries_dict)
+        with self._observe('get'):
+            cached_response = await self.cache.get(key)
+        entry = self._unpack(cached_response) if cached_response else None
+        if entry is not None:
+            if isinstance(entry.value, list):
+                logging.debug('found cache key: %s', key)
+                entry.value = [self.model(**res) for res in entry.value]
+                self._count_request('get_list', entry)
+                return entry
+            if isinstance(entry.value, dict) and 'ids' in entry.value:
+                logging.debug('found refs cache key: %s', key)
+                ids = entry.value['ids']
+                entry.value = await self._hydrate(ids, loader)
+                # Сущность страницы удалена из индекса: укороченная страница выглядела бы последней и осталась бы
+                # без курсора, поэтому она считается промахом и собирается из поиска заново
+                if entry.value is not None and len(entry.value) == len(ids):
+                    self._count_request('get_list', entry)
+                    return entry
+
+        logging.debug('not found `get_list` cache key: %s', key)
+        self._count_request('get_list', None)
         return None
 
-    async def set(self, obj_id: str, value: Union[BaseModel, List[BaseModel]]) -> None:
+    async def get_many(self, obj_ids: List[str], loader: IdsLoader) -> List[BaseModel]:
+        return await self._hydrate(obj_ids, loader)
+
+    async def _hydrate(self, ids: List[str], loader: Optional[IdsLoader]) -> Optional[List[BaseModel]]:
+        with self._observe('get_many'):
+            cached_values = await self.cache.get_many([self.get_cache_key(obj_id) for obj_id in ids])
+        found = {}
+        missing = []
+        for obj_id, cached_value in zip(ids, cached_values):
+            entry = self._unpack(cached_value) if cached_value else None
+            if entry is not None:
+                found[obj_id] = self.model(**entry.value)
+            else:
+                missing.append(obj_id)
+
+        if missing:
+            if loader is None:
+                return None
+            logging.info(f'load {len(missing)} missing refs with prefix: {self.prefix}')
+            loaded = await loader(missing)
+            items = {self.get_cache_key(getattr(v, self.field_pk)): self._pack(v.model_dump()) for v in loaded}
+            self._count_set('hydrate', items)
+            with self._observe('set_many'):
+                await self.cache.set_many(items, self.hard_expire)
+            found.update({getattr(v, self.field_pk): v for v in loaded})
+
+        # Сущности, удалённые из индекса, пропадают из результата
+        return [found[obj_id] for obj_id in ids if obj_id in found]
+
+    async def set(self, obj_id: str, value: Union[BaseModel, List[BaseModel]], cost: float = 0.0) -> None:
         key = self.get_cache_key(obj_id)
-        logging.info(f'set cache key: {key}')
-        await self.cache.set(key, value.model_dump_json())
-
-    async def set_list(self, queries_dict: Union[str, dict, list], values: List[BaseModel]) -> None:
-        for v in values:
-            val = v.model_dump()
+        logging.debug('set cache key: %s', key)
+        data = self._pack(value.model_dump(), cost)
+        self._count_set('set', {key: data})
+        with self._observe('set'):
+            await self.cache.set(key, data, self.hard_expire)
+
+    async def set_list(
+            self, queries_dict: Union[str, dict, list], values: List[BaseModel], cost: float = 0.0
+    ) -> None:
+        items = {}
+        dumped_values = [v.model_dump() for v in values]
+        for val in dumped_values:
             if self.field_pk in val:
-                obj_key = val[self.field_pk]
-                key = self.get_cache_key(obj_key)
-                await self.cache.set(key, v.model_dump_json())
-
-        key = self.get_cache_key(queries_dict)
-        logging.info(f'set `set_list` cache key: {key}')
-        await self.cache.set(key, json.dumps([v.model_dump() for v in values]))
+                items[self.get_cache_key(val[self.field_pk])] = self._pack(val)
+
+        key = await self.get_versioned_list_key(queries_dict)
+        logging.debug('set `set_list` cache key: %s', key)
+        if self.list_as_refs and all(self.field_pk in val for val in dumped_values):
+            items[key] = self._pack({'ids': [val[self.field_pk] for val in dumped_values]}, cost)
+        else:
+            items[key] = self._pack(dumped_values, cost)
+        self._count_set('set_list', items)
+        with self._observe('set_many'):
+            await self.cache.set_many(items, self.hard_expire)
+
+    @property
+    def hard_expire(self) -> Optional[int]:
+        if self.expire is None:
+            return None
+        return self.expire + self.stale_expire
+
+    def _pack(self, value: Any, cost: float = 0.0) -> bytes:
+        soft_expire_at = time.time() + self.expire if self.expire is not None else None
+        return self.codec.encode({'v': value, 's': soft_expire_at, 'd': cost})
+
+    @contextmanager
+    def _observe(self, operation: str):
+        # Время операций по уровням вместе: попадания в L1 дают быстрый хвост, промахи - сеть до Redis
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            metrics.cache_operation_seconds.labels(self.prefix, operation).observe(time.perf_counter() - started)
+
+    def _count_request(self, operation: str, entry: Optional[CacheEntry]) -> None:
+        result = 'miss' if entry is None else 'stale' if entry.stale else 'hit'
+        metrics.cache_requests.labels(self.prefix, operation, result).inc()
+
+    def _count_set(self, operation: str, items: Dict[str, bytes]) -> None:
+        metrics.cache_sets.labels(self.prefix, operation).inc(len(items))
+        metrics.cache_bytes.labels(self.prefix, 'write').inc(sum(len(data) for data in items.values()))
+
+    def _unpack(self, data: bytes) -> Optional[CacheEntry]:
+        started = time.perf_counter()
+        try:
+            envelope = self.codec.decode(data)
+            if not isinstance(envelope, (dict, list)):
+                # Чужой кодек может прочитать байты как число или строку, кэш таких значений не пишет
+                raise ValueError(f'unexpected {type(envelope).__name__} value')
+        except Exception as e:
+            # Значение записано другим кодеком (сменился CACHE_CODECS) или повреждено. Это промах:
+            # вызывающий загрузит сущность заново и перезапишет ключ.
+            logging.warning(f'failed to decode cache value with prefix {self.prefix}: {e!r}')
+            metrics.cache_requests.labels(self.prefix, 'decode', 'error').inc()
+            return None
+        metrics.cache_decode_seconds.labels(self.prefix).observe(time.perf_counter() - started)
+        metrics.cache_bytes.labels(self.prefix, 'read').inc(len(data))
+        if not isinstance(envelope, dict) or 'v' not in envelope:
+            # Значение, записанное до появления конверта
+            return CacheEntry(envelope)
+
+        soft_expire_at = envelope.get('s')
+        if soft_expire_at is None:
+            return CacheEntry(envelope['v'])
+
+        now = time.time()
+        cost = envelope.get('d') or 0.0
+        if self.xfetch_beta and cost:
+            # XFetch: чем дороже пересчёт и ближе истечение, тем вероятнее обновить значение заранее.
+            # 1 - random() лежит в (0, 1], поэтому логарифм определён.
+            now -= cost * self.xfetch_beta * math.log(1.0 - random.random())
+        return CacheEntry(envelope['v'], stale=soft_expire_at <= now)
+
+
+def build_cache_service(
+        cache: Cache,
+        config: ProjectConfig,
+        prefix: str,
+        model: Type[BaseModel],
+        expire: Optional[int] = None,
+        list_as_refs: Optional[bool] = None,
+) -> CacheService:
+    return CacheServiceImpl(
+        cache,
+        prefix=prefix,
+        model=model,
+        field_pk='uuid',
+        list_as_refs=list_as_refs if list_as_refs is not None else config.cache_list_as_refs,
+        codec=get_cache_codec(config, prefix),
+        expire=expire if expire is not None else config.cache_expire,
+        stale_expire=config.cache_stale_expire,
+        xfetch_beta=config.cache_xfetch_beta,
+        negative_expire=config.cache_negative_expire,
+    )
 
 
 async def get_redis() -> Redis:
@@ -119,5 +554,21 @@ async def get_redis() -> Redis:
 
 
 @lru_cache()
-def get_cache(config: ProjectConfig = Depends(get_project_config)) -> RedisCache:
-    return RedisCache(redis, config)
+def get_cache(config: ProjectConfig = Depends(get_project_config)) -> Cache:
+    redis_cache = RedisCache(redis, config)
+    local_caches = {
+        prefix: LocalCache(max_size=size, expire=config.local_cache_expire)
+        for prefix, size in config.local_cache_sizes.items()
+        if size > 0
+    }
+    if not local_caches:
+        return redis_cache
+    return TieredCache(redis_cache, local_caches)
+
+
+def get_cache_codec(config: ProjectConfig, prefix: str) -> Codec:
+    return get_codec(
+        get_codec_name(config.cache_codecs, prefix),
+        compress_threshold=config.cache_compress_threshold,
+        compress_level=config.cache_compress_level,
+    )
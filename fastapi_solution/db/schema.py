@@ -0,0 +1,148 @@
+"""Настройки и маппинги индексов Elasticsearch, от которых зависят запросы сервиса.
+
+Изменения здесь попадают в живые индексы только через переиндексацию: python -m db.indices apply
+обновляет шаблоны, по которым etl/reindex.py создаёт новую версию индекса.
+"""
+from typing import Any, Dict, List
+
+from core.config import ProjectConfig
+
+# Индексы небольшие: один шард не размазывает поиск по сегментам разных шардов
+NUMBER_OF_SHARDS = 1
+# Кэш API всё равно отдаёт данные с задержкой, а редкий refresh дешевле для ETL и реже сбрасывает request cache шарда
+REFRESH_INTERVAL = '5s'
+
+ANALYSIS = {
+    'filter': {
+        'english_stop': {'type': 'stop', 'stopwords': '_english_'},
+        'english_stemmer': {'type': 'stemmer', 'language': 'english'},
+        'english_possessive_stemmer': {'type': 'stemmer', 'language': 'possessive_english'},
+        'russian_stop': {'type': 'stop', 'stopwords': '_russian_'},
+        'russian_stemmer': {'type': 'stemmer', 'language': 'russian'},
+    },
+    'analyzer': {
+        'ru_en': {
+            'tokenizer': 'standard',
+            'filter': [
+                'lowercase',
+                'english_stop',
+                'english_stemmer',
+                'english_possessive_stemmer',
+                'russian_stop',
+                'russian_stemmer',
+            ],
+        },
+    },
+}
+
+KEYWORD = {'type': 'keyword'}
+TEXT = {'type': 'text', 'analyzer': 'ru_en'}
+# Поле для автодополнения: префиксные запросы идут по n-граммам search_as_you_type, а не по wildcard
+SUGGEST_TEXT = {**TEXT, 'fields': {'suggest': {'type': 'search_as_you_type'}}}
+
+# Участники и жанры - обычные объекты, а не nested: фильтры идут по одному полю, nested-документы
+# умножили бы число документов Lucene на размер состава и несовместимы с index.sort
+FILM_PERSON = {'properties': {'uuid': KEYWORD, 'name': TEXT}}
+
+MOVIES = {
+    'settings': {
+        'number_of_shards': NUMBER_OF_SHARDS,
+        'refresh_interval': REFRESH_INTERVAL,
+        # Сегменты хранятся в порядке сортировки списков, и ES останавливает поиск после первых size документов
+        'sort': {'field': ['rating', 'uuid'], 'order': ['desc', 'asc']},
+        'analysis': ANALYSIS,
+    },
+    'mappings': {
+        'dynamic': 'strict',
+        'properties': {
+            'uuid': KEYWORD,
+            'title': SUGGEST_TEXT,
+            'description': TEXT,
+            'rating': {'type': 'float'},
+            'type': KEYWORD,
+            'genres': {
+                'properties': {
+                    # Глобальные ординалы строятся при refresh, а не первым агрегирующим по жанрам запросом
+                    'uuid': {'type': 'keyword', 'eager_global_ordinals': True},
+                    'name': KEYWORD,
+                },
+            },
+            'actors': FILM_PERSON,
+            'directors': FILM_PERSON,
+            'writers': FILM_PERSON,
+        },
+    },
+}
+
+PERSONS = {
+    'settings': {
+        'number_of_shards': NUMBER_OF_SHARDS,
+        'refresh_interval': REFRESH_INTERVAL,
+        'analysis': ANALYSIS,
+    },
+    'mappings': {
+        'dynamic': 'strict',
+        'properties': {
+            'uuid': KEYWORD,
+            'name': SUGGEST_TEXT,
+            'films': {'properties': {'uuid': KEYWORD, 'roles': KEYWORD}},
+        },
+    },
+}
+
+GENRES = {
+    'settings': {
+        'number_of_shards': NUMBER_OF_SHARDS,
+        'refresh_interval': REFRESH_INTERVAL,
+    },
+    'mappings': {
+        'dynamic': 'strict',
+        'properties': {
+            'uuid': KEYWORD,
+            'name': KEYWORD,
+        },
+    },
+}
+
+
+def get_index_schemas(config: ProjectConfig) -> Dict[str, dict]:
+    """Схемы по именам, с которыми работает сервис: это алиасы на версии индексов."""
+    return {
+        config.es_film_index: MOVIES,
+        config.es_person_index: PERSONS,
+        config.es_genre_index: GENRES,
+    }
+
+
+def find_drift(expected: Any, actual: Any, path: str = '') -> List[str]:
+    """Расхождения живых настроек или маппинга со схемой.
+
+    ES дополняет их значениями по умолчанию, поэтому лишние ключи не считаются расхождением,
+    кроме полей в properties: поле вне схемы значит, что маппинг живёт своей жизнью.
+    """
+    if isinstance(expected, dict):
+        if not isinstance(actual, dict):
+            return [f'{path}: expected object, got {actual!r}']
+        drift = []
+        # Тип object ES в маппинге не пишет, а nested вместо object меняет и хранение, и запросы
+        if 'properties' in expected and 'type' not in expected and actual.get('type', 'object') != 'object':
+            drift.append(f'{path}.type: expected object, got {actual["type"]!r}')
+        for key, value in expected.items():
+            key_path = f'{path}.{key}' if path else key
+            if key not in actual:
+                drift.append(f'{key_path}: missing')
+            else:
+                drift.extend(find_drift(value, actual[key], key_path))
+        if path.endswith('properties'):
+            drift.extend(f'{path}.{key}: not in schema' for key in sorted(actual.keys() - expected.keys()))
+        return drift
+
+    if isinstance(expected, list):
+        if not isinstance(actual, list) or len(actual) != len(expected):
+            return [f'{path}: expected {expected!r}, got {actual!r}']
+        return [line for i, value in enumerate(expected) for line in find_drift(value, actual[i], f'{path}[{i}]')]
+
+    # Настройки ES возвращает строками: 1 -> "1", True -> "true"
+    if str(expected).lower() != str(actual).lower():
+        return [f'{path}: expected {expected!r}, got {actual!r}']
+    return []
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 from fastapi.responses import ORJSONResponse
 
+from api import metrics
 from api.v1 import films, genres, persons
 from core.config import get_project_config
 from core.lifespan import lifespan
+from core.response_cache import ResponseCacheMiddleware
 
 project_config = get_project_config()
 
@@ -15,6 +17,9 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+app.add_middleware(ResponseCacheMiddleware)
+
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
 app.include_router(genres.router, prefix='/api/v1/genres', tags=['genres'])
 app.include_router(persons.router, prefix='/api/v1/persons', tags=['persons'])
+app.include_router(metrics.router, tags=['metrics'])
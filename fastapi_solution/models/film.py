@@ -13,6 +13,18 @@ class FilmPerson(BaseModel):
     name: str
 
 
+class FilmShort(BaseModel):
+    """Поля фильма, которые нужны спискам: только они и запрашиваются из ES через _source."""
+    uuid: str
+    title: str
+    rating: float
+
+
+class FilmSuggest(BaseModel):
+    uuid: str
+    title: str
+
+
 class Film(BaseModel):
     uuid: str
     title: str
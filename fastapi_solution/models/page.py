@@ -0,0 +1,11 @@
+from dataclasses import dataclass
+from typing import Generic, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    # Курсор следующей страницы, None - страница последняя
+    next_cursor: Optional[str] = None
@@ -1,4 +1,9 @@
-from fastapi import Query
+from http import HTTPStatus
+from typing import Optional
+
+from fastapi import HTTPException, Query
+
+from utils.cursor import InvalidCursorError, decode_cursor
 
 # todo annotated ???
 class PaginateQueryParams:
@@ -19,6 +24,15 @@ class PaginateQueryParams:
                 ge=1,
                 le=500,
             ),
+            cursor: Optional[str] = Query(
+                None,
+                title="Cursor.",
+                description="Cursor from the X-Next-Cursor header of the previous page, replaces page_number",
+            ),
     ):
         self.page_number = page_number
         self.page_size = page_size
+        try:
+            self.search_after = decode_cursor(cursor)
+        except InvalidCursorError:
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail='invalid cursor')
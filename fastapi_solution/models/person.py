@@ -8,6 +8,11 @@ class PersonFilm(BaseModel):
     roles: list[str]
 
 
+class PersonSuggest(BaseModel):
+    uuid: str
+    name: str
+
+
 class Person(BaseModel):
     uuid: str
     name: str
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException, Query
+
+SEARCH_QUERY_MAX_LENGTH = 200
+# Глубже по релевантности листать бессмысленно, а большие from дорого обходятся ES
+SEARCH_MAX_RESULTS = 1000
+SUGGEST_PREFIX_MAX_LENGTH = 50
+
+
+def normalize_query(query: str) -> str:
+    """Приводит запрос к каноническому виду, чтобы "Star Wars" и "star  wars " попадали в один ключ кэша."""
+    return ' '.join(query.split()).lower()
+
+
+class SearchQueryParams:
+    """Dependency class to parse search query and pagination params."""
+
+    def __init__(
+            self,
+            query: str = Query(
+                ...,
+                title="Search query.",
+                description="Text to search for",
+                min_length=1,
+                max_length=SEARCH_QUERY_MAX_LENGTH,
+            ),
+            page_number: int = Query(
+                1,
+                title="Page number.",
+                description="Page number to return",
+                ge=1,
+            ),
+            page_size: int = Query(
+                20,
+                title="Size of page.",
+                description="The number of records returned per page",
+                ge=1,
+                le=100,
+            ),
+    ):
+        self.query = normalize_query(query)
+        if not self.query:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail='empty query')
+        if page_number * page_size > SEARCH_MAX_RESULTS:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail=f'only first {SEARCH_MAX_RESULTS} results are available'
+            )
+        self.page_number = page_number
+        self.page_size = page_size
+
+
+class SuggestQueryParams:
+    """Dependency class to parse autocomplete params."""
+
+    def __init__(
+            self,
+            prefix: str = Query(
+                ...,
+                title="Prefix.",
+                description="Beginning of the text typed by user",
+                min_length=1,
+                max_length=SUGGEST_PREFIX_MAX_LENGTH,
+            ),
+            size: int = Query(
+                10,
+                title="Number of suggestions.",
+                description="The number of suggestions returned",
+                ge=1,
+                le=20,
+            ),
+    ):
+        self.prefix = normalize_query(prefix)
+        if not self.prefix:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail='empty prefix')
+        self.size = size
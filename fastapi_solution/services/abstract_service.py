@@ -1,35 +1,153 @@
+import time
+from functools import partial
 from abc import ABC, abstractmethod
-from typing import List, Optional, Union, Literal
+from typing import List, Optional, Union, Literal, Awaitable, Callable, Any
 from uuid import UUID
 
+from pydantic import BaseModel
+
 from core.config import ProjectConfig
 from db.elastic import (
     FilmSearchEngineService,
     PersonSearchEngineService,
     SearchEngineService,
 )
-from db.redis import CacheService
-from models.film import Film
+from db.redis import CacheService, CacheEntry
+from models.film import Film, FilmShort, FilmSuggest
 from models.genre import Genre
-from models.person import Person
+from models.page import Page
+from models.person import Person, PersonSuggest
+from utils.background import run_in_background
+from utils.cursor import encode_cursor
 from utils.film_util import FilmSortEnum
+from utils.single_flight import SingleFlight
 
 
-class AbstractFilmService(ABC):
+class BaseService(ABC):
     def __init__(
             self,
             cache_service: CacheService,
-            search_service: FilmSearchEngineService,
+            search_service: SearchEngineService,
             config: ProjectConfig,
     ):
         self.cache_service = cache_service
         self.search_service = search_service
         self.config = config
+        self.single_flight = SingleFlight()
+
+    async def get_or_load(
+            self, obj_id: str, loader: Callable[[], Awaitable[Optional[BaseModel]]]
+    ) -> Optional[BaseModel]:
+        async def load(write_behind: bool = True) -> Optional[BaseModel]:
+            started = time.monotonic()
+            value = await loader()
+            if value is None:
+                await self._write(self.cache_service.set_missing(obj_id), write_behind)
+            else:
+                await self._write(self.cache_service.set(obj_id, value, time.monotonic() - started), write_behind)
+            return value
+
+        entry = await self.cache_service.get_entry(obj_id)
+        return await self._serve(self.cache_service.get_cache_key(obj_id), entry, load)
+
+    async def get_list_or_load(
+            self,
+            queries_dict: Union[str, dict, list],
+            loader: Callable[[], Awaitable[List[BaseModel]]],
+            cache_service: Optional[CacheService] = None,
+    ) -> List[BaseModel]:
+        # Списки с урезанной моделью хранятся в отдельном сервисе кэша, чтобы не смешиваться с полными сущностями
+        cache_service = cache_service or self.cache_service
+
+        async def load(write_behind: bool = True) -> List[BaseModel]:
+            started = time.monotonic()
+            value = await loader()
+            await self._write(
+                cache_service.set_list(queries_dict, value, time.monotonic() - started), write_behind
+            )
+            return value
+
+        entry = await cache_service.get_list_entry(queries_dict, partial(self.load_by_ids, cache_service=cache_service))
+        return await self._serve(cache_service.get_list_key(queries_dict), entry, load)
+
+    async def get_many_or_load(
+            self, obj_ids: List[str], cache_service: Optional[CacheService] = None
+    ) -> List[BaseModel]:
+        # Один MGET по всем ключам и один mget в поисковый движок только для промахов
+        cache_service = cache_service or self.cache_service
+        loader = partial(self.load_by_ids, cache_service=cache_service)
+        return await cache_service.get_many(list(dict.fromkeys(obj_ids)), loader)
+
+    def get_page(self, request_body: dict, items: List[BaseModel], size: int) -> Page:
+        # Курсор считается по последнему элементу, поэтому страницы из кэша тоже получают его без запроса в ES
+        next_cursor = None
+        if items and len(items) >= size:
+            next_cursor = encode_cursor(self.search_service.get_search_after(request_body, items[-1].model_dump()))
+        return Page(items, next_cursor)
+
+    async def _serve(self, key: str, entry: Optional[CacheEntry], load: Callable[..., Awaitable[Any]]) -> Any:
+        if entry is None:
+            return await self.single_flight.do(key, load)
+
+        if entry.stale:
+            # stale-while-revalidate: отвечаем из кэша, а обновление выполняет одна фоновая задача
+            run_in_background(self.single_flight.do(f'{key}:refresh', lambda: self._refresh(key, load)))
+        return entry.value
+
+    async def _refresh(self, key: str, load: Callable[..., Awaitable[Any]]) -> None:
+        # Обновление и так идёт в фоне, поэтому пишем в кэш сразу
+        cache = self.cache_service.cache
+        if not self.config.cache_refresh_lock:
+            await load(write_behind=False)
+            return
+
+        expire = self.config.cache_refresh_lock_expire
+        if not await cache.acquire_lock(key, expire):
+            return
+        try:
+            await load(write_behind=False)
+        finally:
+            await cache.release_lock(key)
+
+    async def load_by_ids(self, ids: List[str], cache_service: Optional[CacheService] = None) -> List[BaseModel]:
+        # Из ES запрашиваются только поля модели, в которую будет собран ответ
+        model = (cache_service or self.cache_service).model
+        search_response = await self.search_service.mget(ids, source=list(model.model_fields))
+        response = self.search_service.get_raw_mget_response(search_response)
+        return [model(**hit) for hit in response]
+
+    async def _write(self, coro: Awaitable[None], write_behind: bool = True) -> None:
+        if write_behind and self.config.cache_write_behind:
+            run_in_background(coro)
+        else:
+            await coro
+
+
+class AbstractFilmService(BaseService):
+    def __init__(
+            self,
+            cache_service: CacheService,
+            search_service: FilmSearchEngineService,
+            config: ProjectConfig,
+            short_cache_service: CacheService,
+            search_cache_service: CacheService,
+            suggest_cache_service: CacheService,
+    ):
+        super().__init__(cache_service, search_service, config)
+        self.short_cache_service = short_cache_service
+        # У результатов поиска и подсказок свои пространства имён и TTL
+        self.search_cache_service = search_cache_service
+        self.suggest_cache_service = suggest_cache_service
 
     @abstractmethod
     async def get_all_films(
-            self, sort: Union[FilmSortEnum, Literal[""]], genre: UUID, page: int, size: int
-    ) -> List[Film]:
+            self,
+            sort: Union[FilmSortEnum, Literal[""]],
+            genre: UUID,
+            page: int,
+            size: int,
+            search_after: Optional[List] = None,
+    ) -> Page[FilmShort]:
         pass
 
     @abstractmethod
@@ -37,23 +155,33 @@ class AbstractFilmService(ABC):
         pass
 
     @abstractmethod
-    async def search_films(self, query: str) -> List[Film]:
+    async def search_films(self, query: str, page: int, size: int) -> List[FilmShort]:
+        pass
+
+    @abstractmethod
+    async def get_films_by_ids(self, film_ids: List[str]) -> List[FilmShort]:
+        pass
+
+    @abstractmethod
+    async def suggest_films(self, prefix: str, size: int) -> List[FilmSuggest]:
         pass
 
 
-class AbstractPersonService(ABC):
+class AbstractPersonService(BaseService):
     def __init__(
             self,
             cache_service: CacheService,
             search_service: PersonSearchEngineService,
             config: ProjectConfig,
+            search_cache_service: CacheService,
+            suggest_cache_service: CacheService,
     ):
-        self.cache_service = cache_service
-        self.search_service = search_service
-        self.config = config
+        super().__init__(cache_service, search_service, config)
+        self.search_cache_service = search_cache_service
+        self.suggest_cache_service = suggest_cache_service
 
     @abstractmethod
-    async def get_all_persons(self, page: int, size: int) -> List[Person]:
+    async def get_all_persons(self, page: int, size: int, search_after: Optional[List] = None) -> Page[Person]:
         pass
 
     @abstractmethod
@@ -61,23 +189,25 @@ class AbstractPersonService(ABC):
         pass
 
     @abstractmethod
-    async def search_persons(self, query: str) -> List[Person]:
+    async def search_persons(self, query: str, page: int, size: int) -> List[Person]:
+        pass
+
+    @abstractmethod
+    async def suggest_persons(self, prefix: str, size: int) -> List[PersonSuggest]:
         pass
 
 
-class AbstractGenreService(ABC):
+class AbstractGenreService(BaseService):
     def __init__(
             self,
             cache_service: CacheService,
             search_service: SearchEngineService,
             config: ProjectConfig,
     ):
-        self.cache_service = cache_service
-        self.search_service = search_service
-        self.config = config
+        super().__init__(cache_service, search_service, config)
 
     @abstractmethod
-    async def get_all_genres(self, page: int, size: int) -> List[Genre]:
+    async def get_all_genres(self, page: int, size: int, search_after: Optional[List] = None) -> Page[Genre]:
         pass
 
     @abstractmethod
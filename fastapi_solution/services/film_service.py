@@ -2,18 +2,19 @@ from functools import lru_cache
 from typing import List, Union, Literal, cast, Optional
 from uuid import UUID
 
-from elasticsearch import NotFoundError
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 
 from core.config import ProjectConfig, get_project_config
 from db.elastic import (
     get_elastic,
+    ElasticSearch,
     FilmSearchEngineService,
     FilmElasticSearchService,
-    SearchEngine,
 )
-from db.redis import get_cache, Cache, CacheService, CacheServiceImpl
-from models.film import Film
+from db.redis import get_cache, Cache, CacheService, build_cache_service
+from models.film import Film, FilmShort, FilmSuggest
+from models.page import Page
 from services.abstract_service import AbstractFilmService
 from utils.film_util import FilmSortEnum
 
@@ -24,67 +25,115 @@ class FilmService(AbstractFilmService):
         cache_service: CacheService,
         search_service: FilmSearchEngineService,
         config: ProjectConfig,
+        short_cache_service: CacheService,
+        search_cache_service: CacheService,
+        suggest_cache_service: CacheService,
     ):
-        super().__init__(cache_service, search_service, config)
+        super().__init__(
+            cache_service, search_service, config, short_cache_service, search_cache_service, suggest_cache_service
+        )
 
     async def get_all_films(
-        self, sort: Union[FilmSortEnum, Literal[""]], genre: UUID, page: int, size: int
-    ) -> List[Film]:
-        query_cache = {"sort": sort, "genre": str(genre), "page": page, "size": size}
-        response = await self.cache_service.get_list(query_cache)
-        if response is not None:
-            return cast(List[Film], response)
-
+        self,
+        sort: Union[FilmSortEnum, Literal[""]],
+        genre: UUID,
+        page: int,
+        size: int,
+        search_after: Optional[List] = None,
+    ) -> Page[FilmShort]:
         request_body = self.search_service.get_request_body()
-        self.search_service.paginate(request_body, page, size)
+        self.search_service.source(request_body, list(FilmShort.model_fields))
         if sort:
             self.search_service.sort(request_body, sort)
         if genre:
             self.search_service.related_filter(request_body, "genres", "uuid", genre)
+        if search_after:
+            query_cache = {"sort": sort, "genre": str(genre), "after": search_after, "size": size}
+            self.search_service.paginate_after(request_body, search_after, size)
+        else:
+            query_cache = {"sort": sort, "genre": str(genre), "page": page, "size": size}
+            self.search_service.paginate(request_body, page, size)
+
+        response = await self.get_list_or_load(
+            query_cache, lambda: self._load_short_films(request_body), self.short_cache_service
+        )
+        return self.get_page(request_body, cast(List[FilmShort], response), size)
+
+    async def get_film_by_id(self, film_id: str) -> Optional[Film]:
+        response = await self.get_or_load(film_id, lambda: self._load_film(film_id))
+        return cast(Optional[Film], response)
+
+    async def get_films_by_ids(self, film_ids: List[str]) -> List[FilmShort]:
+        response = await self.get_many_or_load(film_ids, self.short_cache_service)
+        return cast(List[FilmShort], response)
 
+    async def search_films(self, query: str, page: int, size: int) -> List[FilmShort]:
+        request_body = self.search_service.get_request_body()
+        self.search_service.filter(request_body, "title", query)
+        self.search_service.source(request_body, list(FilmShort.model_fields))
+        self.search_service.paginate(request_body, page, size)
+
+        query_cache = {"query": query, "page": page, "size": size}
+        response = await self.get_list_or_load(
+            query_cache, lambda: self._load_short_films(request_body), self.search_cache_service
+        )
+        return cast(List[FilmShort], response)
+
+    async def suggest_films(self, prefix: str, size: int) -> List[FilmSuggest]:
+        request_body = self.search_service.get_request_body()
+        # Подполе title.suggest появляется после переиндексации по схеме из db/schema.py
+        n_grams = await self.search_service.get_field_type("title.suggest") == "search_as_you_type"
+        self.search_service.prefix_filter(request_body, "title", prefix, n_grams)
+        self.search_service.source(request_body, list(FilmSuggest.model_fields))
+        self.search_service.paginate(request_body, 1, size)
+
+        response = await self.get_list_or_load(
+            {"prefix": prefix, "size": size}, lambda: self._load_suggest(request_body), self.suggest_cache_service
+        )
+        return cast(List[FilmSuggest], response)
+
+    async def _load_suggest(self, request_body: dict) -> List[FilmSuggest]:
         search_response = await self.search_service.search(body=request_body)
         response = self.search_service.get_raw_list_response(search_response)
-        response = [Film(**hit) for hit in response]
+        return [FilmSuggest(**hit) for hit in response]
 
-        await self.cache_service.set_list(query_cache, response)
-        return response
+    async def _load_short_films(self, request_body: dict) -> List[FilmShort]:
+        search_response = await self.search_service.search(body=request_body)
+        response = self.search_service.get_raw_list_response(search_response)
+        return [FilmShort(**hit) for hit in response]
 
-    async def get_film_by_id(self, film_id: str) -> Optional[Film]:
-        if response := await self.cache_service.get(film_id):
-            return response
+    async def _load_film(self, film_id: str) -> Optional[Film]:
         try:
             search_response = await self.search_service.get(id=film_id)
         except NotFoundError:
             return
 
         response = self.search_service.get_raw_retrieve_response(search_response)
-        response = Film(**response)
-
-        await self.cache_service.set(film_id, response)
-        return response
-
-    async def search_films(self, query: str) -> List[Film]:
-        if response := await self.cache_service.get_list(query):
-            return cast(List[Film], response)
-
-        request_body = self.search_service.get_request_body()
-        request_body = self.search_service.filter(request_body, "title", query)
-        search_response = await self.search_service.search(request_body)
-        response = self.search_service.get_raw_list_response(search_response)
-        response = [Film(**hit) for hit in response]
-
-        await self.cache_service.set_list(query, response)
-        return response
+        return Film(**response)
 
 
 @lru_cache()
 def get_film_service(
-    es: SearchEngine = Depends(get_elastic),
+    es: AsyncElasticsearch = Depends(get_elastic),
     cache: Cache = Depends(get_cache),
     config: ProjectConfig = Depends(get_project_config),
 ) -> FilmService:
-    cache_service = CacheServiceImpl(cache, prefix="film_", model=Film, field_pk="uuid")
-    search_service = FilmElasticSearchService(es, index=config.es_film_index)
+    cache_service = build_cache_service(cache, config, prefix="film_", model=Film)
+    short_cache_service = build_cache_service(cache, config, prefix="film_short_", model=FilmShort)
+    search_cache_service = build_cache_service(
+        cache, config, prefix="film_search_", model=FilmShort, expire=config.cache_search_expire
+    )
+    # Подсказки хранятся целиком под одним ключом: лишний MGET для гидрации съел бы выигрыш в задержке
+    suggest_cache_service = build_cache_service(
+        cache, config, prefix="film_suggest_", model=FilmSuggest, expire=config.cache_suggest_expire,
+        list_as_refs=False,
+    )
+    search_service = FilmElasticSearchService(ElasticSearch(es, config), index=config.es_film_index)
     return FilmService(
-        search_service=search_service, cache_service=cache_service, config=config
+        search_service=search_service,
+        cache_service=cache_service,
+        config=config,
+        short_cache_service=short_cache_service,
+        search_cache_service=search_cache_service,
+        suggest_cache_service=suggest_cache_service,
     )
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Mapping, Optional, Tuple
+
+from elasticsearch import AsyncElasticsearch
+
+from core.config import ProjectConfig
+from db.elastic import ElasticSearch, ElasticSearchService, SearchEngineService
+from models.genre import Genre
+from models.page import Page
+from utils.cursor import InvalidCursorError, encode_cursor
+
+LOAD_PAGE_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class GenreSnapshot:
+    """Все жанры в порядке uuid, как их отдаёт ES при сортировке по TIEBREAKER, и словарь для поиска по id.
+
+    Снимок не меняется после создания: обновление собирает новый и подменяет ссылку целиком,
+    поэтому читатели никогда не видят наполовину обновлённый каталог.
+    """
+    genres: Tuple[Genre, ...]
+    by_id: Mapping[str, Genre]
+    ids: Tuple[str, ...]
+    loaded_at: float
+
+    @classmethod
+    def build(cls, genres: List[Genre]) -> 'GenreSnapshot':
+        genres = sorted(genres, key=lambda genre: genre.uuid)
+        return cls(
+            genres=tuple(genres),
+            by_id=MappingProxyType({genre.uuid: genre for genre in genres}),
+            ids=tuple(genre.uuid for genre in genres),
+            loaded_at=time.monotonic(),
+        )
+
+    def get_page(self, page: int, size: int, search_after: Optional[List] = None) -> Page[Genre]:
+        if search_after:
+            # Курсор - значения сортировки [uuid], как у страниц из ES
+            if len(search_after) != 1:
+                raise InvalidCursorError(f'cursor does not match sort: {search_after}')
+            start = bisect_right(self.ids, str(search_after[0]))
+        else:
+            start = (page - 1) * size
+        items = list(self.genres[start:start + size])
+        next_cursor = encode_cursor([items[-1].uuid]) if items and len(items) >= size else None
+        return Page(items, next_cursor)
+
+
+class GenreCatalog:
+    """Каталог жанров в памяти процесса: жанров мало и меняются они редко, поэтому чтение обходится без I/O."""
+
+    def __init__(self, search_service: SearchEngineService, refresh_interval: float):
+        self.search_service = search_service
+        self.refresh_interval = refresh_interval
+        self.snapshot: Optional[GenreSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    async def load(self) -> GenreSnapshot:
+        async with self._lock:
+            genres = []
+            search_after = None
+            while True:
+                request_body = self.search_service.get_request_body()
+                self.search_service.paginate_after(request_body, search_after, LOAD_PAGE_SIZE)
+                search_response = await self.search_service.search(body=request_body)
+                chunk = self.search_service.get_raw_list_response(search_response)
+                genres.extend(Genre(**hit) for hit in chunk)
+                if len(chunk) < LOAD_PAGE_SIZE:
+                    break
+                search_after = self.search_service.get_search_after(request_body, chunk[-1])
+
+            self.snapshot = GenreSnapshot.build(genres)
+            logging.info(f'genre catalog loaded: {len(genres)} genres')
+            return self.snapshot
+
+    async def refresh(self) -> bool:
+        # При ошибке остаётся прежний снимок: устаревшие жанры лучше, чем их отсутствие
+        try:
+            await self.load()
+        except Exception as e:
+            logging.warning(f'genre catalog refresh failed: {e!r}')
+            return False
+        return True
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+
+@lru_cache()
+def get_genre_catalog(es: AsyncElasticsearch, config: ProjectConfig) -> GenreCatalog:
+    # Один каталог на процесс: его загружает lifespan, а читают сервисы жанров
+    search_service = ElasticSearchService(ElasticSearch(es, config), index=config.es_genre_index)
+    return GenreCatalog(search_service, config.genre_catalog_refresh_interval)
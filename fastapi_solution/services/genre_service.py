@@ -1,19 +1,21 @@
 from functools import lru_cache
 from typing import List, cast, Optional
 
-from elasticsearch import NotFoundError
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 
 from core.config import ProjectConfig, get_project_config
 from db.elastic import (
     get_elastic,
+    ElasticSearch,
     SearchEngineService,
     ElasticSearchService,
-    SearchEngine,
 )
-from db.redis import get_cache, CacheService, Cache, CacheServiceImpl
+from db.redis import get_cache, CacheService, Cache, build_cache_service
 from models.genre import Genre
+from models.page import Page
 from services.abstract_service import AbstractGenreService
+from services.genre_catalog import GenreCatalog, GenreSnapshot, get_genre_catalog
 
 
 class GenreService(AbstractGenreService):
@@ -22,51 +24,63 @@ class GenreService(AbstractGenreService):
         cache_service: CacheService,
         search_service: SearchEngineService,
         config: ProjectConfig,
+        catalog: Optional[GenreCatalog] = None,
     ):
         super().__init__(cache_service, search_service, config)
+        self.catalog = catalog
 
-    async def get_all_genres(self, page: int, size: int) -> List[Genre]:
-        query_cache = {page: page, size: size}
-        response = await self.cache_service.get_list(query_cache)
-        if response is not None:
-            return cast(List[Genre], response)
+    async def get_all_genres(self, page: int, size: int, search_after: Optional[List] = None) -> Page[Genre]:
+        # Пока снимок не загружен (ES был недоступен при старте), жанры идут обычным путём через кэш
+        if snapshot := self._get_snapshot():
+            return snapshot.get_page(page, size, search_after)
 
         request_body = self.search_service.get_request_body()
-        self.search_service.paginate(request_body, page, size)
+        if search_after:
+            query_cache = {"after": search_after, "size": size}
+            self.search_service.paginate_after(request_body, search_after, size)
+        else:
+            query_cache = {"page": page, "size": size}
+            self.search_service.paginate(request_body, page, size)
+
+        response = await self.get_list_or_load(query_cache, lambda: self._load_genres(request_body))
+        return self.get_page(request_body, cast(List[Genre], response), size)
+
+    async def get_genre_by_id(self, genre_id: str) -> Optional[Genre]:
+        if snapshot := self._get_snapshot():
+            return snapshot.by_id.get(genre_id)
+
+        response = await self.get_or_load(genre_id, lambda: self._load_genre(genre_id))
+        return cast(Optional[Genre], response)
+
+    def _get_snapshot(self) -> Optional[GenreSnapshot]:
+        return self.catalog.snapshot if self.catalog is not None else None
+
+    async def _load_genres(self, request_body: dict) -> List[Genre]:
         search_response = await self.search_service.search(body=request_body)
 
         response = self.search_service.get_raw_list_response(search_response)
-        response = [Genre(**hit) for hit in response]
-
-        await self.cache_service.set_list(query_cache, response)
-        return response
+        return [Genre(**hit) for hit in response]
 
-    async def get_genre_by_id(self, genre_id: str) -> Optional[Genre]:
-        if response := await self.cache_service.get(genre_id):
-            return response
+    async def _load_genre(self, genre_id: str) -> Optional[Genre]:
         try:
             search_response = await self.search_service.get(id=genre_id)
         except NotFoundError:
             return
 
         response = self.search_service.get_raw_retrieve_response(search_response)
-        response = Genre(**response)
-
-        await self.cache_service.set(genre_id, response)
-        return response
+        return Genre(**response)
 
 
 @lru_cache()
 def get_genre_service(
-    es: SearchEngine = Depends(get_elastic),
+    es: AsyncElasticsearch = Depends(get_elastic),
     cache: Cache = Depends(get_cache),
     config: ProjectConfig = Depends(get_project_config),
 ) -> GenreService:
-    cache_service = CacheServiceImpl(
-        cache, prefix="genre_", model=Genre, field_pk="uuid"
-    )
-    search_service = ElasticSearchService(es, index=config.es_genre_index)
+    cache_service = build_cache_service(cache, config, prefix="genre_", model=Genre)
+    search_service = ElasticSearchService(ElasticSearch(es, config), index=config.es_genre_index)
+    catalog = get_genre_catalog(es=es, config=config) if config.genre_catalog_enabled else None
 
     return GenreService(
-        search_service=search_service, cache_service=cache_service, config=config
+        search_service=search_service, cache_service=cache_service, config=config, catalog=catalog
     )
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+import orjson
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from core.config import ProjectConfig
+from core.response_cache import ResponseCache, build_response_cache
+from db.redis import Cache, CacheService, build_cache_service
+from models.film import Film, FilmShort, FilmSuggest
+from models.genre import Genre
+from models.person import Person, PersonSuggest
+from services.genre_catalog import GenreCatalog
+
+# Какие ещё списки устаревают при изменении сущности: имена жанров и персон денормализованы в фильмы
+DEPENDENT_LISTS = {
+    'film': [],
+    'genre': ['film'],
+    'person': ['film'],
+}
+
+RECONNECT_DELAY = 1.0
+
+
+class CacheInvalidator:
+    """Сбрасывает кэш по событиям изменения контента, которые публикует movies_admin."""
+
+    def __init__(
+            self,
+            cache_services: Dict[str, List[CacheService]],
+            response_cache: Optional[ResponseCache] = None,
+            genre_catalog: Optional[GenreCatalog] = None,
+    ):
+        self.cache_services = cache_services
+        self.response_cache = response_cache
+        self.genre_catalog = genre_catalog
+
+    async def handle(self, event: dict) -> None:
+        entity = event.get('entity')
+        if entity not in self.cache_services:
+            logging.warning(f'unknown invalidation event: {event}')
+            return
+
+        ids: List[str] = event.get('ids') or []
+        if ids:
+            for cache_service in self.cache_services[entity]:
+                await cache_service.invalidate(ids)
+        for list_entity in [entity, *DEPENDENT_LISTS[entity]]:
+            for cache_service in self.cache_services[list_entity]:
+                await cache_service.invalidate_lists()
+        # Снимок жанров перечитывается до сброса готовых ответов, иначе в них могли бы снова попасть старые жанры
+        if entity == 'genre' and self.genre_catalog is not None:
+            await self.genre_catalog.refresh()
+        # Готовые ответы не знают, из каких сущностей собраны, поэтому сбрасываются целиком
+        if self.response_cache is not None:
+            await self.response_cache.invalidate()
+
+    async def listen(self, redis: Redis, channel: str) -> None:
+        while True:
+            try:
+                async with redis.pubsub() as pubsub:
+                    await pubsub.subscribe(channel)
+                    async for message in pubsub.listen():
+                        if message['type'] == 'message':
+                            await self._handle_message(message['data'])
+            except RedisError as e:
+                logging.warning(f'invalidation subscription lost: {e!r}, reconnecting')
+                await asyncio.sleep(RECONNECT_DELAY)
+
+    async def _handle_message(self, data: bytes) -> None:
+        try:
+            await self.handle(orjson.loads(data))
+        except Exception:
+            logging.exception(f'failed to handle invalidation event: {data!r}')
+
+
+def get_cache_invalidator(
+        cache: Cache, config: ProjectConfig, genre_catalog: Optional[GenreCatalog] = None
+) -> CacheInvalidator:
+    return CacheInvalidator({
+        'film': [
+            build_cache_service(cache, config, prefix='film_', model=Film),
+            build_cache_service(cache, config, prefix='film_short_', model=FilmShort),
+            build_cache_service(cache, config, prefix='film_search_', model=FilmShort),
+            build_cache_service(cache, config, prefix='film_suggest_', model=FilmSuggest),
+        ],
+        'genre': [build_cache_service(cache, config, prefix='genre_', model=Genre)],
+        'person': [
+            build_cache_service(cache, config, prefix='person_', model=Person),
+            build_cache_service(cache, config, prefix='person_search_', model=Person),
+            build_cache_service(cache, config, prefix='person_suggest_', model=PersonSuggest),
+        ],
+    }, build_response_cache(cache, config), genre_catalog)
@@ -1,18 +1,19 @@
 from functools import lru_cache
-from typing import List, Union, cast
+from typing import List, Optional, Union, cast
 
-from elasticsearch import NotFoundError
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 
 from core.config import ProjectConfig, get_project_config
 from db.elastic import (
     get_elastic,
+    ElasticSearch,
     PersonSearchEngineService,
-    SearchEngine,
     PersonElasticSearchService,
 )
-from db.redis import CacheService, Cache, get_cache, CacheServiceImpl
-from models.person import Person
+from db.redis import CacheService, Cache, get_cache, build_cache_service
+from models.page import Page
+from models.person import Person, PersonSuggest
 from services.abstract_service import AbstractPersonService
 
 
@@ -22,63 +23,90 @@ class PersonService(AbstractPersonService):
         cache_service: CacheService,
         search_service: PersonSearchEngineService,
         config: ProjectConfig,
+        search_cache_service: CacheService,
+        suggest_cache_service: CacheService,
     ):
-        super().__init__(cache_service, search_service, config)
+        super().__init__(cache_service, search_service, config, search_cache_service, suggest_cache_service)
 
-    async def get_all_persons(self, page: int, size: int) -> List[Person]:
-        query_cache = {page: page, size: size}
-        response = await self.cache_service.get_list(query_cache)
-        if response is not None:
-            return cast(List[Person], response)
+    async def get_all_persons(self, page: int, size: int, search_after: Optional[List] = None) -> Page[Person]:
+        request_body = self.search_service.get_request_body()
+        if search_after:
+            query_cache = {"after": search_after, "size": size}
+            self.search_service.paginate_after(request_body, search_after, size)
+        else:
+            query_cache = {"page": page, "size": size}
+            self.search_service.paginate(request_body, page, size)
+
+        response = await self.get_list_or_load(query_cache, lambda: self._load_persons(request_body))
+        return self.get_page(request_body, cast(List[Person], response), size)
+
+    async def get_person_by_id(self, person_id: str) -> Union[Person, None]:
+        response = await self.get_or_load(person_id, lambda: self._load_person(person_id))
+        return cast(Union[Person, None], response)
 
+    async def search_persons(self, query: str, page: int, size: int) -> List[Person]:
         request_body = self.search_service.get_request_body()
+        self.search_service.filter(request_body, "name", query)
         self.search_service.paginate(request_body, page, size)
 
+        query_cache = {"query": query, "page": page, "size": size}
+        response = await self.get_list_or_load(
+            query_cache, lambda: self._load_persons(request_body), self.search_cache_service
+        )
+        return cast(List[Person], response)
+
+    async def suggest_persons(self, prefix: str, size: int) -> List[PersonSuggest]:
+        request_body = self.search_service.get_request_body()
+        # Подполе name.suggest появляется после переиндексации по схеме из db/schema.py
+        n_grams = await self.search_service.get_field_type("name.suggest") == "search_as_you_type"
+        self.search_service.prefix_filter(request_body, "name", prefix, n_grams)
+        self.search_service.source(request_body, list(PersonSuggest.model_fields))
+        self.search_service.paginate(request_body, 1, size)
+
+        response = await self.get_list_or_load(
+            {"prefix": prefix, "size": size}, lambda: self._load_suggest(request_body), self.suggest_cache_service
+        )
+        return cast(List[PersonSuggest], response)
+
+    async def _load_suggest(self, request_body: dict) -> List[PersonSuggest]:
         search_response = await self.search_service.search(body=request_body)
         response = self.search_service.get_raw_list_response(search_response)
-        response = [Person(**hit) for hit in response]
+        return [PersonSuggest(**hit) for hit in response]
 
-        await self.cache_service.set_list(query_cache, response)
-        return response
-
-    async def get_person_by_id(self, person_id: str) -> Union[Person, None]:
-        if response := await self.cache_service.get(person_id):
-            return response
+    async def _load_persons(self, request_body: dict) -> List[Person]:
+        search_response = await self.search_service.search(body=request_body)
+        response = self.search_service.get_raw_list_response(search_response)
+        return [Person(**hit) for hit in response]
 
+    async def _load_person(self, person_id: str) -> Union[Person, None]:
         try:
             search_response = await self.search_service.get(id=person_id)
         except NotFoundError:
             return
 
         response = self.search_service.get_raw_retrieve_response(search_response)
-        response = Person(**response)
-
-        await self.cache_service.set(person_id, response)
-        return response
-
-    async def search_persons(self, query: str) -> List[Person]:
-        if response := await self.cache_service.get_list(query):
-            return cast(List[Person], response)
-
-        request_body = self.search_service.get_request_body()
-        request_body = self.search_service.filter(request_body, "name", query)
-        search_response = await self.search_service.search(request_body)
-        response = self.search_service.get_raw_list_response(search_response)
-        response = [Person(**hit) for hit in response]
-        await self.cache_service.set_list(query, response)
-        return response
+        return Person(**response)
 
 
 @lru_cache()
 def get_person_service(
-    es: SearchEngine = Depends(get_elastic),
+    es: AsyncElasticsearch = Depends(get_elastic),
     cache: Cache = Depends(get_cache),
     config: ProjectConfig = Depends(get_project_config),
 ) -> PersonService:
-    cache_service = CacheServiceImpl(
-        cache, prefix="person_", model=Person, field_pk="uuid"
+    cache_service = build_cache_service(cache, config, prefix="person_", model=Person)
+    search_cache_service = build_cache_service(
+        cache, config, prefix="person_search_", model=Person, expire=config.cache_search_expire
+    )
+    suggest_cache_service = build_cache_service(
+        cache, config, prefix="person_suggest_", model=PersonSuggest, expire=config.cache_suggest_expire,
+        list_as_refs=False,
     )
-    search_service = PersonElasticSearchService(es, index=config.es_person_index)
+    search_service = PersonElasticSearchService(ElasticSearch(es, config), index=config.es_person_index)
     return PersonService(
-        search_service=search_service, cache_service=cache_service, config=config
+        search_service=search_service,
+        cache_service=cache_service,
+        config=config,
+        search_cache_service=search_cache_service,
+        suggest_cache_service=suggest_cache_service,
     )
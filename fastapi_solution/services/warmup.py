@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import math
+from functools import partial
+from typing import Awaitable, Callable, List
+
+from core.config import ProjectConfig
+from db.redis import Cache
+from models.genre import Genre
+from services.film_service import FilmService
+from services.genre_service import GenreService
+from utils.film_util import FilmSortEnum
+
+GENRES_PAGE_SIZE = 500
+WARMUP_LOCK_KEY = 'cache_warmup'
+
+
+class CacheWarmer:
+    """Заранее заполняет кэш самыми востребованными страницами, чтобы после деплоя не ходить в ES вхолодную."""
+
+    def __init__(self, film_service: FilmService, genre_service: GenreService, cache: Cache, config: ProjectConfig):
+        self.film_service = film_service
+        self.genre_service = genre_service
+        self.cache = cache
+        self.config = config
+        self.semaphore = asyncio.Semaphore(config.cache_warmup_concurrency)
+
+    async def run(self) -> None:
+        # Воркеры всех узлов стартуют разом, а Redis у них общий: прогревает тот, кто первым взял блокировку.
+        # Блокировка не снимается и истекает сама, чтобы воркеры, стартовавшие во время прогрева, его не повторяли.
+        timeout = self.config.cache_warmup_timeout
+        if not await self.cache.acquire_lock(WARMUP_LOCK_KEY, math.ceil(timeout)):
+            logging.info('cache warm-up is running in another worker')
+            return
+        try:
+            await asyncio.wait_for(self.warm_up(), timeout=timeout)
+        except Exception as e:
+            # Сервис работает и с холодным кэшем
+            logging.warning(f'cache warm-up failed: {e!r}')
+
+    async def warm_up(self) -> None:
+        genres = await self._get_all_genres()
+
+        page_size = self.config.cache_warmup_page_size
+        top_films = self.config.cache_warmup_top_films
+        # Лучшие фильмы - первые страницы по рейтингу без фильтра по жанру, их прогревается больше
+        top_key = (FilmSortEnum.imdb_rating_desc, '')
+        top_pages = max(self.config.cache_warmup_pages, math.ceil(top_films / page_size))
+        top_jobs = [
+            partial(self.film_service.get_all_films, *top_key, page, page_size) for page in range(1, top_pages + 1)
+        ]
+        jobs = [
+            partial(self.film_service.get_all_films, sort, genre_id, page, page_size)
+            for sort in ['', *FilmSortEnum]
+            for genre_id in ['', *(genre.uuid for genre in genres)]
+            if (sort, genre_id) != top_key
+            for page in range(1, self.config.cache_warmup_pages + 1)
+        ]
+
+        results = await asyncio.gather(*(self._limited(job) for job in [*top_jobs, *jobs]), return_exceptions=True)
+        failed = sum(isinstance(result, Exception) for result in results)
+
+        # Карточки лучших фильмов открывают чаще всего, а они лежат под своими ключами, не в страницах списков
+        top_ids = [
+            film.uuid for page in results[:len(top_jobs)] if not isinstance(page, Exception) for film in page.items
+        ][:top_films]
+        film_results = await asyncio.gather(
+            *(self._limited(partial(self.film_service.get_film_by_id, film_id)) for film_id in top_ids),
+            return_exceptions=True,
+        )
+        failed += sum(isinstance(result, Exception) for result in film_results)
+        logging.info(
+            f'cache warm-up finished: {len(genres)} genres, {len(results)} film pages, {len(top_ids)} films, '
+            f'{failed} failed'
+        )
+
+    async def _get_all_genres(self) -> List[Genre]:
+        genres = []
+        page = 1
+        while True:
+            chunk = await self._limited(partial(self.genre_service.get_all_genres, page, GENRES_PAGE_SIZE))
+            genres.extend(chunk.items)
+            if chunk.next_cursor is None:
+                return genres
+            page += 1
+
+    async def _limited(self, job: Callable[[], Awaitable]):
+        async with self.semaphore:
+            return await job()
@@ -0,0 +1,33 @@
+import os
+
+import pytest
+
+# ProjectConfig требует секрет JWT, а модули сервиса читают конфиг при импорте
+os.environ.setdefault('JWT_SECRET_KEY', 'test')
+
+
+class FakeClock:
+    """Управляемые часы вместо модуля time: TTL проверяются без реального ожидания."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def perf_counter(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    fake_clock = FakeClock()
+    for module in ('db.redis', 'db.elastic'):
+        monkeypatch.setattr(f'{module}.time', fake_clock)
+    return fake_clock
@@ -0,0 +1,80 @@
+from uuid import UUID
+
+import pytest
+
+from db.redis import CacheServiceImpl, LocalCache
+from models.genre import Genre
+from utils.cache_keys import MAX_KEY_LENGTH, build_cache_key
+from utils.film_util import FilmSortEnum
+
+
+def test_key_does_not_depend_on_dict_order():
+    assert build_cache_key({'page': 1, 'size': 50}) == build_cache_key({'size': 50, 'page': 1})
+
+
+def test_key_normalizes_uuid_and_enum():
+    uuid = UUID('3d825f60-9fff-4dfe-b294-1a45fa1e115d')
+    sort = next(iter(FilmSortEnum))
+
+    assert build_cache_key({'genre': uuid, 'sort': sort}) == build_cache_key({'genre': str(uuid), 'sort': sort.value})
+
+
+def test_string_key_is_kept_as_is():
+    assert build_cache_key('3d825f60-9fff-4dfe-b294-1a45fa1e115d') == '3d825f60-9fff-4dfe-b294-1a45fa1e115d'
+
+
+def test_long_key_is_hashed():
+    key = build_cache_key({'query': 'x' * MAX_KEY_LENGTH})
+
+    assert len(key) == 32
+    assert key == build_cache_key({'query': 'x' * MAX_KEY_LENGTH})
+    assert key != build_cache_key({'query': 'y' * MAX_KEY_LENGTH})
+
+
+@pytest.fixture
+def cache() -> LocalCache:
+    return LocalCache(max_size=100, expire=3600)
+
+
+def make_cache_service(cache, prefix: str, negative_expire: int = 0) -> CacheServiceImpl:
+    return CacheServiceImpl(cache, prefix=prefix, model=Genre, expire=60, negative_expire=negative_expire)
+
+
+def test_keys_of_different_kinds_never_match():
+    films = make_cache_service(None, 'film_')
+    short_films = make_cache_service(None, 'film_short_')
+    keys = [
+        films.get_cache_key('short_1'),
+        films.get_cache_key('list:version'),
+        films.get_cache_key('404:1'),
+        films.get_missing_key('1'),
+        films.list_version_key,
+        short_films.get_cache_key('1'),
+        short_films.get_missing_key('1'),
+        short_films.list_version_key,
+    ]
+
+    assert len(set(keys)) == len(keys)
+
+
+@pytest.mark.asyncio
+async def test_id_looking_like_another_key_reads_its_own_entry(cache):
+    films = make_cache_service(cache, 'film_')
+    short_films = make_cache_service(cache, 'film_short_')
+    await short_films.set('1', Genre(uuid='1', name='Drama'))
+    await films.invalidate_lists()
+
+    assert await films.get('short_1') is None
+    assert await films.get('list:version') is None
+
+
+@pytest.mark.asyncio
+async def test_missing_mark_does_not_evict_other_prefix(cache):
+    films = make_cache_service(cache, 'film_', negative_expire=60)
+    short_films = make_cache_service(cache, 'film_short_')
+    genre = Genre(uuid='1', name='Drama')
+    await short_films.set('1', genre)
+
+    await films.set_missing('short_1')
+
+    assert await short_films.get('1') == genre
@@ -0,0 +1,34 @@
+import pytest
+from prometheus_client import REGISTRY
+
+from db.redis import CacheServiceImpl, LocalCache
+from models.genre import Genre
+
+pytestmark = pytest.mark.asyncio
+
+PREFIX = 'metrics_genre_'
+
+
+def observed(operation: str) -> float:
+    return REGISTRY.get_sample_value(
+        'cache_operation_seconds_count', {'prefix': PREFIX, 'operation': operation},
+    ) or 0.0
+
+
+async def load(ids):
+    return [Genre(uuid=obj_id, name=obj_id) for obj_id in ids]
+
+
+async def test_cache_operations_are_timed_per_prefix_and_operation():
+    cache_service = CacheServiceImpl(LocalCache(max_size=100, expire=60), prefix=PREFIX, model=Genre, expire=60)
+    before = {operation: observed(operation) for operation in ('get', 'get_many', 'set', 'set_many')}
+
+    await cache_service.set('a', Genre(uuid='a', name='A'))
+    await cache_service.get_entry('a')
+    await cache_service.set_list({'page': 1}, [Genre(uuid='a', name='A')])
+    await cache_service.get_many(['a', 'b'], load)
+
+    assert observed('set') == before['set'] + 1
+    assert observed('get') - before['get'] >= 1
+    assert observed('set_many') == before['set_many'] + 2
+    assert observed('get_many') - before['get_many'] >= 1
@@ -0,0 +1,69 @@
+import pytest
+
+from db.codecs import ZSTD_MAGIC, JsonCodec, MsgpackCodec, OrjsonCodec, ZstdCodec, get_codec, get_codec_name
+from db.redis import CacheServiceImpl, LocalCache
+from models.genre import Genre
+
+VALUE = {'v': {'uuid': '1', 'title': 'Звёздные войны', 'rating': 8.6, 'genres': [{'name': 'Sci-Fi'}]}, 's': None}
+
+
+@pytest.mark.parametrize('codec', [JsonCodec(), OrjsonCodec(), MsgpackCodec(), ZstdCodec(OrjsonCodec(), threshold=1)])
+def test_codec_round_trip(codec):
+    assert codec.decode(codec.encode(VALUE)) == VALUE
+
+
+def test_zstd_compresses_only_from_threshold():
+    codec = ZstdCodec(OrjsonCodec(), threshold=1024)
+    small = codec.encode({'v': 'x'})
+    large = codec.encode({'v': 'x' * 2048})
+
+    assert small[:4] != ZSTD_MAGIC
+    assert large[:4] == ZSTD_MAGIC
+    assert codec.decode(small) == {'v': 'x'}
+    assert codec.decode(large) == {'v': 'x' * 2048}
+
+
+def test_get_codec_parses_name():
+    codec = get_codec('msgpack+zstd', compress_threshold=10)
+
+    assert isinstance(codec, ZstdCodec)
+    assert isinstance(codec.codec, MsgpackCodec)
+    assert codec.threshold == 10
+    assert isinstance(get_codec('orjson'), OrjsonCodec)
+
+
+@pytest.mark.parametrize('name', ['yaml', 'orjson+gzip'])
+def test_get_codec_rejects_unknown_name(name):
+    with pytest.raises(ValueError):
+        get_codec(name)
+
+
+def test_get_codec_name_prefers_longest_prefix():
+    codecs = {'film_': 'orjson+zstd', 'film_short_': 'msgpack'}
+
+    assert get_codec_name(codecs, 'film_short_') == 'msgpack'
+    assert get_codec_name(codecs, 'film_') == 'orjson+zstd'
+    assert get_codec_name(codecs, 'genre_') == 'orjson'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('old_codec, new_codec', [
+    (MsgpackCodec(), OrjsonCodec()),
+    (OrjsonCodec(), MsgpackCodec()),
+    (ZstdCodec(OrjsonCodec(), threshold=1), OrjsonCodec()),
+])
+async def test_value_from_another_codec_is_a_miss(old_codec, new_codec):
+    cache = LocalCache(max_size=100, expire=60)
+    old_service = CacheServiceImpl(cache, prefix='genre_', model=Genre, codec=old_codec, expire=60)
+    new_service = CacheServiceImpl(cache, prefix='genre_', model=Genre, codec=new_codec, expire=60)
+    genre = Genre(uuid='1', name='Drama')
+    await old_service.set('1', genre)
+
+    assert await new_service.get('1') is None
+
+    async def loader(ids):
+        return [Genre(uuid=obj_id, name='Drama') for obj_id in ids]
+
+    # Пересчитанное значение перезаписывает ключ новым кодеком
+    assert await new_service.get_many(['1'], loader) == [genre]
+    assert await new_service.get('1') == genre
@@ -0,0 +1,97 @@
+import pytest
+
+from core.config import get_project_config
+from db.elastic import TIEBREAKER, ElasticSearch, ElasticSearchService, FilmElasticSearchService
+from db.redis import CacheServiceImpl, LocalCache
+from models.genre import Genre
+from services.abstract_service import BaseService
+from services.genre_catalog import GenreSnapshot
+from utils.cursor import InvalidCursorError, decode_cursor, encode_cursor
+from utils.film_util import FilmSortEnum
+
+
+def make_search_service() -> ElasticSearchService:
+    return ElasticSearchService(ElasticSearch(None, get_project_config()), index='genres')
+
+
+@pytest.mark.parametrize('values', [[8.5, 'a1'], ['a1'], [None, 'a1'], [1, 'кириллица']])
+def test_cursor_round_trip(values):
+    cursor = encode_cursor(values)
+
+    assert '=' not in cursor
+    assert decode_cursor(cursor) == values
+
+
+def test_empty_cursor_means_first_page():
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+
+
+@pytest.mark.parametrize('cursor', ['!!!', 'bm90IGpzb24', encode_cursor([]), 'eyJhIjoxfQ', encode_cursor([[1], 'a'])])
+def test_invalid_cursor(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_cursor_must_match_sort():
+    search_service = FilmElasticSearchService(ElasticSearch(None, get_project_config()), index='movies')
+    request_body = search_service.get_request_body()
+    search_service.sort(request_body, FilmSortEnum.imdb_rating_desc)
+
+    with pytest.raises(InvalidCursorError):
+        search_service.paginate_after(request_body, ['a1'], 10)
+
+    search_service.paginate_after(request_body, [8.5, 'a1'], 10)
+    assert request_body['search_after'] == [8.5, 'a1']
+
+
+def test_snapshot_page_rejects_foreign_cursor():
+    snapshot = GenreSnapshot.build([Genre(uuid='a', name='A')])
+
+    with pytest.raises(InvalidCursorError):
+        snapshot.get_page(1, 10, [8.5, 'a'])
+
+
+def test_snapshot_pages_follow_cursor():
+    snapshot = GenreSnapshot.build([Genre(uuid=uuid, name=uuid) for uuid in 'cabd'])
+
+    first = snapshot.get_page(1, 3)
+    second = snapshot.get_page(1, 3, decode_cursor(first.next_cursor))
+
+    assert [genre.uuid for genre in first.items] == ['a', 'b', 'c']
+    assert [genre.uuid for genre in second.items] == ['d']
+    assert second.next_cursor is None
+
+
+def test_full_page_gets_cursor_of_last_item():
+    service = BaseService(None, make_search_service(), get_project_config())
+    request_body = service.search_service.get_request_body()
+    service.search_service.paginate_after(request_body, None, 2)
+    genres = [Genre(uuid='a', name='A'), Genre(uuid='b', name='B')]
+
+    assert decode_cursor(service.get_page(request_body, genres, 2).next_cursor) == ['b']
+    assert service.get_page(request_body, genres[:1], 2).next_cursor is None
+    assert request_body['sort'] == [TIEBREAKER]
+
+
+@pytest.mark.asyncio
+async def test_cached_page_with_deleted_entity_is_a_miss():
+    cache_service = CacheServiceImpl(
+        LocalCache(max_size=100, expire=60), prefix='genre_', model=Genre, list_as_refs=True, expire=60,
+    )
+    genres = [Genre(uuid='a', name='A'), Genre(uuid='b', name='B')]
+    await cache_service.set_list({'page': 1}, genres)
+    await cache_service.invalidate(['b'])
+
+    async def loader(ids):
+        return [genre for genre in genres if genre.uuid in ids]
+
+    assert await cache_service.get_list({'page': 1}, loader) == genres
+
+    async def loader_after_delete(ids):
+        # Сущность b удалена из индекса
+        return [genre for genre in genres if genre.uuid in ids and genre.uuid != 'b']
+
+    await cache_service.invalidate(['b'])
+    # Иначе страница из одного элемента при size=2 осталась бы без курсора
+    assert await cache_service.get_list({'page': 1}, loader_after_delete) is None
@@ -0,0 +1,65 @@
+import pytest
+
+from core.config import get_project_config
+from core.response_cache import ResponseCacheMiddleware, build_etag, etag_matches
+
+ETAG = build_etag(b'body')
+
+
+def test_etag_depends_on_body_only():
+    assert build_etag(b'body') == ETAG
+    assert build_etag(b'other') != ETAG
+    assert ETAG.startswith(b'"') and ETAG.endswith(b'"')
+
+
+@pytest.mark.parametrize('if_none_match', [
+    ETAG,
+    b'W/' + ETAG,
+    b'"other", ' + ETAG,
+    b' *',
+])
+def test_etag_matches(if_none_match):
+    assert etag_matches(if_none_match, ETAG)
+
+
+@pytest.mark.parametrize('if_none_match', [b'"other"', ETAG.strip(b'"'), b''])
+def test_etag_does_not_match(if_none_match):
+    assert not etag_matches(if_none_match, ETAG)
+
+
+async def app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'application/json')]})
+    await send({'type': 'http.response.body', 'body': b'[1,', 'more_body': True})
+    await send({'type': 'http.response.body', 'body': b'2]'})
+
+
+async def call(if_none_match: bytes = None):
+    config = get_project_config().model_copy(update={'response_cache_enabled': False})
+    middleware = ResponseCacheMiddleware(app, config)
+    headers = [(b'if-none-match', if_none_match)] if if_none_match else []
+    scope = {'type': 'http', 'method': 'GET', 'path': config.response_cache_paths[0], 'headers': headers}
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await middleware(scope, None, send)
+    return messages
+
+
+@pytest.mark.asyncio
+async def test_response_gets_etag_of_whole_body():
+    start, body = await call()
+
+    assert start['status'] == 200
+    assert dict(start['headers'])[b'etag'] == build_etag(b'[1,2]')
+    assert body['body'] == b'[1,2]'
+
+
+@pytest.mark.asyncio
+async def test_matching_if_none_match_gets_304_without_body():
+    start, body = await call(build_etag(b'[1,2]'))
+
+    assert start['status'] == 304
+    assert set(dict(start['headers'])) == {b'etag', b'cache-control'}
+    assert body['body'] == b''
@@ -0,0 +1,86 @@
+import pytest
+
+import services.genre_catalog as genre_catalog
+from core.config import get_project_config
+from db.elastic import ElasticSearch, ElasticSearchService
+from models.genre import Genre
+from services.genre_catalog import GenreCatalog
+from services.genre_service import GenreService
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeElasticsearch:
+    """search с сортировкой по uuid и search_after, как у индекса жанров."""
+
+    def __init__(self, genres: list):
+        self.genres = genres
+        self.searches = 0
+        self.fail = None
+
+    async def search(self, index, body):
+        self.searches += 1
+        if self.fail is not None:
+            raise self.fail
+        genres = sorted(self.genres, key=lambda genre: genre['uuid'])
+        if 'search_after' in body:
+            genres = [genre for genre in genres if genre['uuid'] > body['search_after'][0]]
+        return {'hits': {'hits': [{'_source': genre} for genre in genres[:body['size']]]}}
+
+
+def make_catalog(es: FakeElasticsearch) -> GenreCatalog:
+    config = get_project_config().model_copy(update={'es_msearch_enabled': False})
+    return GenreCatalog(ElasticSearchService(ElasticSearch(es, config), index='genres'), refresh_interval=60)
+
+
+def make_genres(n: int) -> list:
+    return [{'uuid': f'g{i:02}', 'name': f'Genre {i}'} for i in range(n)]
+
+
+async def test_load_reads_all_pages(monkeypatch):
+    monkeypatch.setattr(genre_catalog, 'LOAD_PAGE_SIZE', 2)
+    es = FakeElasticsearch(make_genres(5))
+
+    snapshot = await make_catalog(es).load()
+
+    assert snapshot.ids == ('g00', 'g01', 'g02', 'g03', 'g04')
+    assert es.searches == 3
+
+
+async def test_failed_refresh_keeps_previous_snapshot():
+    es = FakeElasticsearch(make_genres(2))
+    catalog = make_catalog(es)
+    snapshot = await catalog.load()
+
+    es.fail = ConnectionError('down')
+
+    assert not await catalog.refresh()
+    assert catalog.snapshot is snapshot
+
+
+async def test_refresh_swaps_snapshot():
+    es = FakeElasticsearch(make_genres(1))
+    catalog = make_catalog(es)
+    old = await catalog.load()
+
+    es.genres = make_genres(2)
+
+    assert await catalog.refresh()
+    assert catalog.snapshot is not old
+    assert old.ids == ('g00',)
+    assert catalog.snapshot.ids == ('g00', 'g01')
+
+
+async def test_service_reads_snapshot_without_search():
+    es = FakeElasticsearch(make_genres(3))
+    catalog = make_catalog(es)
+    await catalog.load()
+    service = GenreService(None, catalog.search_service, get_project_config(), catalog=catalog)
+    searches = es.searches
+
+    page = await service.get_all_genres(page=1, size=2)
+
+    assert [genre.uuid for genre in page.items] == ['g00', 'g01']
+    assert await service.get_genre_by_id('g02') == Genre(uuid='g02', name='Genre 2')
+    assert await service.get_genre_by_id('missing') is None
+    assert es.searches == searches
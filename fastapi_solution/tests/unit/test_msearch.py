@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from db.msearch import MultiSearchBatcher, MultiSearchError
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeElasticsearch:
+    """_msearch, который отвечает на каждый поиск его телом или ошибкой, если в теле есть error."""
+
+    def __init__(self, fail: Exception = None):
+        self.batches = []
+        self.fail = fail
+
+    async def msearch(self, searches):
+        self.batches.append(searches)
+        if self.fail is not None:
+            raise self.fail
+        bodies = searches[1::2]
+        return {'responses': [
+            {'error': {'type': body['error']}, 'status': 400} if 'error' in body else {'hits': body}
+            for body in bodies
+        ]}
+
+
+async def test_searches_within_window_go_in_one_msearch():
+    es = FakeElasticsearch()
+    batcher = MultiSearchBatcher(es, window=0.01, max_size=10)
+
+    results = await asyncio.gather(*(batcher.search(f'index{i}', {'n': i}) for i in range(3)))
+
+    assert [result['hits'] for result in results] == [{'n': 0}, {'n': 1}, {'n': 2}]
+    assert es.batches == [[{'index': 'index0'}, {'n': 0}, {'index': 'index1'}, {'n': 1}, {'index': 'index2'}, {'n': 2}]]
+
+
+async def test_full_batch_is_sent_without_waiting_for_window():
+    es = FakeElasticsearch()
+    batcher = MultiSearchBatcher(es, window=60, max_size=2)
+
+    results = await asyncio.wait_for(asyncio.gather(batcher.search('a', {'n': 0}), batcher.search('a', {'n': 1})), 1)
+
+    assert len(results) == 2
+    assert len(es.batches) == 1
+
+
+async def test_error_of_one_search_fails_only_its_caller():
+    batcher = MultiSearchBatcher(FakeElasticsearch(), window=0.01, max_size=10)
+
+    ok, failed = await asyncio.gather(
+        batcher.search('a', {'n': 0}), batcher.search('a', {'error': 'parse'}), return_exceptions=True,
+    )
+
+    assert ok == {'hits': {'n': 0}}
+    assert isinstance(failed, MultiSearchError)
+    assert failed.status == 400
+
+
+async def test_transport_error_fails_whole_batch():
+    batcher = MultiSearchBatcher(FakeElasticsearch(fail=ConnectionError('down')), window=0.01, max_size=10)
+
+    results = await asyncio.gather(batcher.search('a', {}), batcher.search('b', {}), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+async def test_cancelled_caller_does_not_break_others():
+    es = FakeElasticsearch()
+    batcher = MultiSearchBatcher(es, window=0.01, max_size=10)
+
+    cancelled = asyncio.create_task(batcher.search('a', {'n': 0}))
+    waiting = asyncio.create_task(batcher.search('a', {'n': 1}))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert (await waiting)['hits'] == {'n': 1}
+    assert cancelled.cancelled()
@@ -0,0 +1,92 @@
+import pytest
+
+from core.config import get_project_config
+from core.response_cache import GENRES_PATH, ResponseCache, ResponseCacheMiddleware
+from db.redis import LocalCache
+from models.search_params import SEARCH_QUERY_MAX_LENGTH
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def response_cache() -> ResponseCache:
+    return ResponseCache(LocalCache(max_size=100, expire=60), expire=60)
+
+
+async def test_key_ignores_parameter_order(response_cache):
+    assert (
+        await response_cache.get_key('/api/v1/films/', b'page_size=10&sort=-imdb')
+        == await response_cache.get_key('/api/v1/films/', b'sort=-imdb&page_size=10')
+    )
+
+
+@pytest.mark.parametrize('query_string', [
+    b'query=Star%20Wars',
+    b'query=star++wars+',
+    b'query=%20STAR%09wars',
+])
+async def test_search_query_is_normalized(response_cache, query_string):
+    assert (
+        await response_cache.get_key('/api/v1/films/search', query_string)
+        == await response_cache.get_key('/api/v1/films/search', b'query=star+wars')
+    )
+
+
+async def test_suggest_prefix_is_normalized(response_cache):
+    assert (
+        await response_cache.get_key('/api/v1/persons/suggest', b'prefix=%D0%9B%D0%A3%D0%9A%D0%90%D0%A1+&size=5')
+        == await response_cache.get_key('/api/v1/persons/suggest', b'size=5&prefix=%D0%BB%D1%83%D0%BA%D0%B0%D1%81')
+    )
+
+
+async def test_too_long_query_is_not_shortened_into_valid_one(response_cache):
+    padded = b'query=' + b'+' * SEARCH_QUERY_MAX_LENGTH + b'star'
+
+    assert (
+        await response_cache.get_key('/api/v1/films/search', padded)
+        != await response_cache.get_key('/api/v1/films/search', b'query=star')
+    )
+
+
+async def test_other_parameters_are_kept_as_is(response_cache):
+    assert (
+        await response_cache.get_key('/api/v1/films/', b'genre=ABC')
+        != await response_cache.get_key('/api/v1/films/', b'genre=abc')
+    )
+
+
+async def test_invalidate_changes_keys(response_cache):
+    key = await response_cache.get_key('/api/v1/genres/', b'')
+    await response_cache.invalidate()
+
+    assert await response_cache.get_key('/api/v1/genres/', b'') != key
+
+
+class FailingResponseCache:
+    async def get_key(self, path, query_string):
+        raise AssertionError('response cache must not be used')
+
+
+async def app(scope, receive, send):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': b'[]'})
+
+
+@pytest.mark.parametrize('catalog_enabled, uses_cache', [(True, False), (False, True)])
+async def test_genres_skip_response_cache_when_served_from_catalog(catalog_enabled, uses_cache):
+    config = get_project_config().model_copy(update={'genre_catalog_enabled': catalog_enabled})
+    middleware = ResponseCacheMiddleware(app, config)
+    middleware._response_cache = FailingResponseCache()
+    scope = {'type': 'http', 'method': 'GET', 'path': f'{GENRES_PATH}/', 'headers': [], 'query_string': b''}
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    if uses_cache:
+        with pytest.raises(AssertionError):
+            await middleware(scope, None, send)
+    else:
+        await middleware(scope, None, send)
+        assert messages[0]['status'] == 200
+        assert any(name == b'etag' for name, _ in messages[0]['headers'])
@@ -0,0 +1,59 @@
+import pytest
+
+from core.config import get_project_config
+from db.elastic import ElasticSearchFilterMixin
+from db.schema import find_drift, get_index_schemas
+
+GENRES = {'properties': {'uuid': {'type': 'keyword'}, 'name': {'type': 'text'}}}
+
+
+def test_live_index_equal_to_schema_has_no_drift():
+    for schema in get_index_schemas(get_project_config()).values():
+        assert find_drift(schema['mappings'], schema['mappings']) == []
+
+
+def test_defaults_added_by_es_are_not_drift():
+    actual = {'properties': {
+        'uuid': {'type': 'keyword', 'ignore_above': 256},
+        'name': {'type': 'text'},
+    }}
+
+    assert find_drift(GENRES, actual) == []
+
+
+@pytest.mark.parametrize('actual, drift', [
+    ({'properties': {'uuid': {'type': 'keyword'}}}, ['properties.name: missing']),
+    ({'properties': {**GENRES['properties'], 'extra': {'type': 'keyword'}}}, ['properties.extra: not in schema']),
+    ({'properties': {**GENRES['properties'], 'name': {'type': 'keyword'}}},
+     ["properties.name.type: expected 'text', got 'keyword'"]),
+])
+def test_field_drift(actual, drift):
+    assert find_drift(GENRES, actual) == drift
+
+
+def test_nested_instead_of_object_is_drift():
+    expected = {'properties': {'genres': GENRES}}
+    actual = {'properties': {'genres': {'type': 'nested', **GENRES}}}
+
+    assert find_drift(expected, actual) == ["properties.genres.type: expected object, got 'nested'"]
+
+
+@pytest.mark.parametrize('expected, actual', [(1, '1'), (True, 'true'), ('5s', '5s')])
+def test_settings_are_compared_as_strings(expected, actual):
+    assert find_drift({'refresh_interval': expected}, {'refresh_interval': actual}) == []
+
+
+def test_list_length_is_drift():
+    assert find_drift({'field': ['rating', 'uuid']}, {'field': ['rating']}) == [
+        "field: expected ['rating', 'uuid'], got ['rating']",
+    ]
+
+
+def test_related_filter_matches_object_and_nested_mappings():
+    body = ElasticSearchFilterMixin.related_filter({}, 'genres', 'uuid', 'g1')
+    term = {'term': {'genres.uuid': 'g1'}}
+
+    assert body['query']['bool']['filter'] == [{'bool': {
+        'should': [{'nested': {'path': 'genres', 'query': term, 'ignore_unmapped': True}}, term],
+        'minimum_should_match': 1,
+    }}]
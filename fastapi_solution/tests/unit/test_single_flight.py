@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+class Loader:
+    """Загрузка, которая ждёт разрешения завершиться и считает свои вызовы."""
+
+    def __init__(self, result='value'):
+        self.result = result
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+async def test_concurrent_calls_share_one_load():
+    single_flight = SingleFlight()
+    loader = Loader()
+
+    waiters = [asyncio.create_task(single_flight.do('k', loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    assert await asyncio.gather(*waiters) == ['value'] * 5
+    assert loader.calls == 1
+
+
+async def test_different_keys_load_separately():
+    single_flight = SingleFlight()
+    first, second = Loader('a'), Loader('b')
+    first.release.set()
+    second.release.set()
+
+    assert await asyncio.gather(single_flight.do('a', first), single_flight.do('b', second)) == ['a', 'b']
+    assert first.calls == second.calls == 1
+
+
+async def test_key_is_forgotten_after_load():
+    single_flight = SingleFlight()
+    loader = Loader()
+    loader.release.set()
+
+    await single_flight.do('k', loader)
+    await single_flight.do('k', loader)
+
+    assert loader.calls == 2
+
+
+async def test_error_is_shared_and_not_remembered():
+    single_flight = SingleFlight()
+    loader = Loader(ValueError('boom'))
+
+    waiters = [asyncio.create_task(single_flight.do('k', loader)) for _ in range(3)]
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert loader.calls == 1
+
+    loader.result = 'value'
+    assert await single_flight.do('k', loader) == 'value'
+
+
+async def test_cancelled_waiter_does_not_cancel_load():
+    single_flight = SingleFlight()
+    loader = Loader()
+
+    cancelled = asyncio.create_task(single_flight.do('k', loader))
+    waiting = asyncio.create_task(single_flight.do('k', loader))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    loader.release.set()
+
+    assert await waiting == 'value'
+    assert cancelled.cancelled()
+    assert loader.calls == 1
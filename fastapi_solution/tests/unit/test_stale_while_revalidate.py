@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+
+from core.config import get_project_config
+from db.redis import CacheEntry, CacheServiceImpl, LocalCache
+from models.genre import Genre
+from services.abstract_service import BaseService
+from utils.background import wait_background_tasks
+
+pytestmark = pytest.mark.asyncio
+
+GENRE = Genre(uuid='1', name='Drama')
+
+
+@pytest.fixture
+def cache() -> LocalCache:
+    return LocalCache(max_size=100, expire=3600)
+
+
+@pytest.fixture
+def cache_service(cache) -> CacheServiceImpl:
+    return CacheServiceImpl(cache, prefix='genre_', model=Genre, expire=10, stale_expire=30)
+
+
+def make_service(cache_service, refresh_lock: bool = False) -> BaseService:
+    config = get_project_config().model_copy(update={'cache_refresh_lock': refresh_lock})
+    return BaseService(cache_service, search_service=None, config=config)
+
+
+async def test_entry_turns_stale_after_soft_expire(clock, cache_service):
+    await cache_service.set('1', GENRE)
+
+    clock.advance(9)
+    assert await cache_service.get_entry('1') == CacheEntry(GENRE, stale=False)
+    clock.advance(1)
+    assert await cache_service.get_entry('1') == CacheEntry(GENRE, stale=True)
+
+
+async def test_stale_entry_disappears_after_hard_expire(clock, cache_service):
+    await cache_service.set('1', GENRE)
+
+    clock.advance(39)
+    assert await cache_service.get_entry('1') is not None
+    clock.advance(1)
+    assert await cache_service.get_entry('1') is None
+
+
+async def test_stale_entry_is_served_while_one_refresh_runs(cache_service):
+    service = make_service(cache_service)
+    release = asyncio.Event()
+    loads = []
+
+    async def load(write_behind: bool = True):
+        loads.append(write_behind)
+        await release.wait()
+        return GENRE
+
+    stale = CacheEntry(Genre(uuid='1', name='Old'), stale=True)
+    results = [await service._serve('genre_1', stale, load) for _ in range(3)]
+    release.set()
+    await wait_background_tasks()
+
+    assert [result.name for result in results] == ['Old'] * 3
+    # Фоновое обновление одно и пишет в кэш сразу, а не ещё одной фоновой задачей
+    assert loads == [False]
+
+
+async def test_refresh_is_skipped_while_another_worker_holds_lock(cache, cache_service):
+    service = make_service(cache_service, refresh_lock=True)
+    loads = []
+
+    async def load(write_behind: bool = True):
+        loads.append(write_behind)
+        return GENRE
+
+    await cache.acquire_lock('genre_1', 5)
+    await service._serve('genre_1', CacheEntry(GENRE, stale=True), load)
+    await wait_background_tasks()
+    assert loads == []
+
+    await cache.release_lock('genre_1')
+    await service._serve('genre_1', CacheEntry(GENRE, stale=True), load)
+    await wait_background_tasks()
+    assert loads == [False]
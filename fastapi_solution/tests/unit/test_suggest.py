@@ -0,0 +1,74 @@
+import pytest
+
+from core.config import get_project_config
+from db.elastic import ElasticSearch, ElasticSearchFilterMixin, flatten_mapping
+
+pytestmark = pytest.mark.asyncio
+
+OLD_MAPPING = {'properties': {'title': {'type': 'text'}, 'genres': {'type': 'nested', 'properties': {}}}}
+NEW_MAPPING = {'properties': {
+    'title': {'type': 'text', 'fields': {'suggest': {'type': 'search_as_you_type'}}},
+    'genres': {'properties': {'uuid': {'type': 'keyword'}}},
+}}
+
+
+class FakeIndices:
+    def __init__(self, mappings: dict):
+        self.mappings = mappings
+        self.calls = 0
+
+    async def get_mapping(self, index):
+        self.calls += 1
+        return {name: {'mappings': mapping} for name, mapping in self.mappings.items()}
+
+
+class FakeElasticsearch:
+    def __init__(self, mappings: dict):
+        self.indices = FakeIndices(mappings)
+
+
+def make_search_engine(mappings: dict) -> ElasticSearch:
+    return ElasticSearch(FakeElasticsearch(mappings), get_project_config())
+
+
+async def test_flatten_mapping_includes_subfields_and_objects():
+    assert flatten_mapping(NEW_MAPPING['properties']) == {
+        'title': 'text',
+        'title.suggest': 'search_as_you_type',
+        'genres': 'object',
+        'genres.uuid': 'keyword',
+    }
+
+
+async def test_field_types_are_remembered():
+    search_engine = make_search_engine({'movies_v1': NEW_MAPPING})
+
+    assert (await search_engine.get_field_types('movies'))['title.suggest'] == 'search_as_you_type'
+    await search_engine.get_field_types('movies')
+    assert search_engine.es.indices.calls == 1
+
+
+async def test_field_types_expire(clock):
+    search_engine = make_search_engine({'movies_v1': OLD_MAPPING})
+    assert 'title.suggest' not in await search_engine.get_field_types('movies')
+
+    search_engine.es.indices.mappings = {'movies_v2': NEW_MAPPING}
+    clock.advance(get_project_config().es_mapping_expire)
+    assert 'title.suggest' in await search_engine.get_field_types('movies')
+
+
+async def test_field_must_exist_in_every_index_behind_alias():
+    search_engine = make_search_engine({'movies_v1': OLD_MAPPING, 'movies_v2': NEW_MAPPING})
+    types = await search_engine.get_field_types('movies')
+
+    assert types == {'title': 'text'}
+
+
+async def test_prefix_filter_uses_n_grams_only_when_mapped():
+    with_n_grams = ElasticSearchFilterMixin.prefix_filter({}, 'title', 'star w', True)
+    without_n_grams = ElasticSearchFilterMixin.prefix_filter({}, 'title', 'star w', False)
+
+    assert with_n_grams['query']['bool']['must'][0]['multi_match']['fields'] == [
+        'title.suggest', 'title.suggest._2gram', 'title.suggest._3gram',
+    ]
+    assert without_n_grams['query']['bool']['must'] == [{'match_bool_prefix': {'title': 'star w'}}]
@@ -0,0 +1,97 @@
+import pytest
+
+from db.redis import LocalCache, TieredCache
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_size=2, expire=60)
+    await cache.set('a', b'1')
+    await cache.set('b', b'2')
+    # Чтение продлевает жизнь ключу, поэтому вытесняется b
+    assert await cache.get('a') == b'1'
+    await cache.set('c', b'3')
+
+    assert await cache.get('a') == b'1'
+    assert await cache.get('b') is None
+    assert await cache.get('c') == b'3'
+
+
+async def test_local_cache_expires_entries(clock):
+    cache = LocalCache(max_size=10, expire=5)
+    await cache.set('a', b'1')
+
+    clock.advance(4.9)
+    assert await cache.get('a') == b'1'
+    clock.advance(0.1)
+    assert await cache.get('a') is None
+
+
+async def test_local_cache_never_outlives_remote_ttl(clock):
+    cache = LocalCache(max_size=10, expire=5)
+    await cache.set('a', b'1', expire=2)
+
+    clock.advance(2)
+    assert await cache.get('a') is None
+
+
+async def test_local_cache_lock_is_exclusive_until_released():
+    cache = LocalCache(max_size=10, expire=60)
+
+    assert await cache.acquire_lock('k', 5)
+    assert not await cache.acquire_lock('k', 5)
+    await cache.release_lock('k')
+    assert await cache.acquire_lock('k', 5)
+
+
+@pytest.fixture
+def remote() -> LocalCache:
+    # Вместо Redis - тот же in-process кэш без ограничений
+    return LocalCache(max_size=1000, expire=3600)
+
+
+@pytest.fixture
+def tiered(remote) -> TieredCache:
+    return TieredCache(remote, {
+        'film_': LocalCache(max_size=10, expire=1),
+        'film_short_': LocalCache(max_size=10, expire=1),
+    })
+
+
+async def test_tiered_cache_picks_longest_prefix(tiered):
+    assert tiered.get_local('film_short_1') is dict(tiered.local_caches)['film_short_']
+    assert tiered.get_local('film_1') is dict(tiered.local_caches)['film_']
+    assert tiered.get_local('person_1') is None
+
+
+async def test_tiered_cache_fills_local_on_remote_hit(tiered, remote):
+    await remote.set('film_1', b'v')
+
+    assert await tiered.get('film_1') == b'v'
+    await remote.delete(['film_1'])
+    # Второе чтение обслуживает L1
+    assert await tiered.get('film_1') == b'v'
+
+
+async def test_tiered_cache_get_many_reads_remote_only_for_local_misses(tiered, remote):
+    await tiered.set('film_1', b'1')
+    await remote.set('film_2', b'2')
+    await remote.delete(['film_1'])
+
+    assert await tiered.get_many(['film_1', 'film_2', 'film_3']) == [b'1', b'2', None]
+
+
+async def test_tiered_cache_delete_clears_both_levels(tiered, remote):
+    await tiered.set('film_1', b'1')
+    await tiered.delete(['film_1'])
+
+    assert await remote.get('film_1') is None
+    assert await tiered.get('film_1') is None
+
+
+async def test_tiered_cache_without_local_cache_goes_to_remote(tiered, remote):
+    await tiered.set('person_1', b'1')
+
+    assert await remote.get('person_1') == b'1'
+    assert await tiered.get('person_1') == b'1'
@@ -0,0 +1,61 @@
+import pytest
+
+from core.config import get_project_config
+from db.redis import LocalCache
+from models.film import FilmShort
+from models.genre import Genre
+from models.page import Page
+from services.warmup import CacheWarmer
+from utils.film_util import FilmSortEnum
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeFilmService:
+    def __init__(self):
+        self.pages = []
+        self.films = []
+
+    async def get_all_films(self, sort, genre, page, size):
+        self.pages.append((sort, genre, page, size))
+        start = (page - 1) * size
+        return Page([FilmShort(uuid=str(i), title='', rating=0) for i in range(start, start + size)])
+
+    async def get_film_by_id(self, film_id):
+        self.films.append(film_id)
+
+
+class FakeGenreService:
+    async def get_all_genres(self, page, size):
+        return Page([Genre(uuid='g1', name='Drama')])
+
+
+def make_warmer(cache, **settings) -> CacheWarmer:
+    config = get_project_config().model_copy(update={
+        'cache_warmup_pages': 2, 'cache_warmup_page_size': 50, 'cache_warmup_top_films': 120, **settings,
+    })
+    return CacheWarmer(FakeFilmService(), FakeGenreService(), cache, config)
+
+
+async def test_top_films_are_warmed_as_client_pages_and_details():
+    warmer = make_warmer(LocalCache(max_size=10, expire=60))
+    await warmer.warm_up()
+
+    pages = warmer.film_service.pages
+    top = [page for page in pages if page[:2] == (FilmSortEnum.imdb_rating_desc, '')]
+    assert top == [(FilmSortEnum.imdb_rating_desc, '', page, 50) for page in (1, 2, 3)]
+    assert {size for *_, size in pages} == {50}
+    # Остальные сочетания сортировки и жанра - по cache_warmup_pages страниц
+    assert len(pages) == len(top) + (3 * 2 - 1) * 2
+    assert warmer.film_service.films == [str(i) for i in range(120)]
+
+
+async def test_only_one_worker_warms_up():
+    cache = LocalCache(max_size=10, expire=60)
+    first, second = make_warmer(cache), make_warmer(cache)
+
+    await first.run()
+    await second.run()
+
+    assert first.film_service.pages
+    assert not second.film_service.pages
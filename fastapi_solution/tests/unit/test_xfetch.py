@@ -0,0 +1,56 @@
+import math
+
+import pytest
+
+from db.redis import CacheServiceImpl, LocalCache
+from models.genre import Genre
+
+pytestmark = pytest.mark.asyncio
+
+GENRE = Genre(uuid='1', name='Drama')
+
+
+def make_cache_service(xfetch_beta: float) -> CacheServiceImpl:
+    cache = LocalCache(max_size=100, expire=3600)
+    return CacheServiceImpl(cache, prefix='genre_', model=Genre, expire=10, stale_expire=30, xfetch_beta=xfetch_beta)
+
+
+def draw(monkeypatch, gap: float) -> None:
+    # random() такой, что -log(1 - random()) == gap
+    monkeypatch.setattr('db.redis.random.random', lambda: 1.0 - math.exp(-gap))
+
+
+async def test_expensive_entry_is_refreshed_early(clock, monkeypatch):
+    cache_service = make_cache_service(xfetch_beta=1.0)
+    await cache_service.set('1', GENRE, cost=2.0)
+    clock.advance(5)
+
+    # До истечения 5 секунд, а сдвиг cost * beta * gap = 6
+    draw(monkeypatch, 3.0)
+    assert (await cache_service.get_entry('1')).stale
+    # Сдвиг 4 до истечения не дотягивает
+    draw(monkeypatch, 2.0)
+    assert not (await cache_service.get_entry('1')).stale
+
+
+async def test_early_refresh_grows_closer_to_expiry(clock, monkeypatch):
+    cache_service = make_cache_service(xfetch_beta=1.0)
+    await cache_service.set('1', GENRE, cost=1.0)
+    draw(monkeypatch, 2.0)
+
+    clock.advance(7)
+    assert not (await cache_service.get_entry('1')).stale
+    clock.advance(1)
+    assert (await cache_service.get_entry('1')).stale
+
+
+@pytest.mark.parametrize('xfetch_beta, cost', [(0.0, 2.0), (1.0, 0.0)])
+async def test_no_early_refresh_without_beta_or_cost(clock, monkeypatch, xfetch_beta, cost):
+    cache_service = make_cache_service(xfetch_beta)
+    await cache_service.set('1', GENRE, cost=cost)
+    draw(monkeypatch, 100.0)
+
+    clock.advance(9.9)
+    assert not (await cache_service.get_entry('1')).stale
+    clock.advance(0.1)
+    assert (await cache_service.get_entry('1')).stale
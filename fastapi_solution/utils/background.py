@@ -0,0 +1,24 @@
+import asyncio
+import logging
+from typing import Awaitable, Set
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def run_in_background(coro: Awaitable) -> asyncio.Task:
+    """Запускает корутину в фоне, сохраняя ссылку на задачу до её завершения."""
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+    return task
+
+
+def _on_done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and (exc := task.exception()):
+        logging.error(f'background task failed: {exc!r}', exc_info=exc)
+
+
+async def wait_background_tasks() -> None:
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
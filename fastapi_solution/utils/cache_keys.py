@@ -0,0 +1,29 @@
+import hashlib
+import json
+from enum import Enum
+from typing import Any
+from uuid import UUID
+
+# Более длинные ключи заменяются хэшем, чтобы не хранить в Redis произвольно длинные строки
+MAX_KEY_LENGTH = 128
+
+
+def normalize(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return normalize(value.value)
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    return value
+
+
+def build_cache_key(obj: Any) -> str:
+    """Строит канонический ключ: одинаковые запросы всегда дают одинаковую строку."""
+    obj = normalize(obj)
+    key = obj if isinstance(obj, str) else json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    if len(key) > MAX_KEY_LENGTH:
+        key = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    return key
@@ -0,0 +1,27 @@
+import base64
+import binascii
+from typing import List, Optional
+
+import orjson
+
+
+class InvalidCursorError(ValueError):
+    """Курсор не разбирается или не подходит к сортировке запроса."""
+
+
+def encode_cursor(values: List) -> str:
+    """Упаковывает значения сортировки последнего документа в непрозрачную строку для search_after."""
+    return base64.urlsafe_b64encode(orjson.dumps(values)).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List]:
+    if not cursor:
+        return None
+    try:
+        values = orjson.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError) as e:
+        raise InvalidCursorError(f'invalid cursor: {cursor}') from e
+    if not isinstance(values, list) or not values or any(isinstance(value, (list, dict)) for value in values):
+        # Значения сортировки - только скаляры
+        raise InvalidCursorError(f'invalid cursor: {cursor}')
+    return values
@@ -0,0 +1,31 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Объединяет конкурентные вызовы с одинаковым ключом в один.
+
+    Пока для ключа выполняется загрузка, остальные вызывающие ждут её результат,
+    а не запускают собственный запрос. Загрузка выполняется в отдельной задаче,
+    поэтому отмена одного из ожидающих не прерывает её для остальных.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: Any) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Помечаем исключение обработанным, даже если все ожидающие были отменены
+        if not task.cancelled():
+            task.exception()
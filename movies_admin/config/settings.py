@@ -42,6 +42,10 @@ AUTHENTICATION_BACKENDS = [
 AUTH_API_LOGIN_URL = 'http://0.0.0.0:8001/api/v1/auth/login'  # Замените на реальный URL вашего Auth-сервиса
 AUTH_API_GET_USER_URL = 'http://0.0.0.0:8001/api/v1/auth/me'  # Замените на реальный URL вашего Auth-сервиса
 
+REDIS_HOST = os.environ.get('REDIS_HOST', '127.0.0.1')
+REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+CACHE_INVALIDATION_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL', 'movies:invalidation')
+
 LANGUAGE_CODE = 'ru-RU'
 
 LOCALE_PATHS = ['movies/locale']
@@ -6,3 +6,6 @@ class MoviesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     verbose_name = _('movies')
     name = 'movies'
+
+    def ready(self):
+        from movies import signals  # noqa: F401
@@ -0,0 +1,63 @@
+import json
+import logging
+from functools import lru_cache
+from typing import Iterable
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from movies.models import Filmwork, Genre, GenreFilmwork, Person, PersonFilmwork
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache()
+def get_redis() -> redis.Redis:
+    return redis.Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
+
+
+def publish_change(entity: str, ids: Iterable) -> None:
+    """Сообщает сервису выдачи контента, какие сущности изменились, после коммита транзакции."""
+    event = json.dumps({'entity': entity, 'ids': [str(obj_id) for obj_id in ids]})
+
+    def send():
+        try:
+            get_redis().publish(settings.CACHE_INVALIDATION_CHANNEL, event)
+        except redis.RedisError:
+            # Недоступный Redis не должен ломать сохранение в админке: кэш всё равно истечёт по TTL
+            logger.exception('failed to publish cache invalidation event: %s', event)
+
+    transaction.on_commit(send)
+
+
+@receiver([post_save, post_delete], sender=Filmwork)
+def filmwork_changed(sender, instance, **kwargs):
+    publish_change('film', [instance.id])
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    publish_change('genre', [instance.id])
+    # Название жанра денормализовано в документы фильмов
+    publish_change('film', Filmwork.objects.filter(genres=instance).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=Person)
+def person_changed(sender, instance, **kwargs):
+    publish_change('person', [instance.id])
+    # Имя персоны денормализовано в документы фильмов
+    publish_change('film', Filmwork.objects.filter(persons=instance).values_list('id', flat=True))
+
+
+@receiver([post_save, post_delete], sender=GenreFilmwork)
+def genre_filmwork_changed(sender, instance, **kwargs):
+    publish_change('film', [instance.film_work_id])
+
+
+@receiver([post_save, post_delete], sender=PersonFilmwork)
+def person_filmwork_changed(sender, instance, **kwargs):
+    publish_change('film', [instance.film_work_id])
+    publish_change('person', [instance.person_id])